@@ -1,7 +1,11 @@
 import streamlit as st
 
+import perf
+
 # 1. 使用 st.Page() 定義所有頁面
 # 注意：st.Page() 會自動尋找 .py 檔案
+# 頁面檔案只有在被選到時才會執行，所以 pydeck、plotly 等較重的套件
+# 請在各頁面裡匯入，不要放在 app.py (首頁因此不需要載入它們)
 pages = [
    st.Page("page_home.py", title="專案首頁", icon="🏠"),
    st.Page("page_3Dmap-1.py", title="Pydeck 3D互動地圖瀏覽", icon="🗺️"),
@@ -13,7 +17,19 @@ with st.sidebar:
     st.title("關於我：自我介紹")
     # st.navigation() 會回傳被選擇的頁面
     selected_page = st.navigation(pages)
+    # 開啟後會在側邊欄顯示每個階段 (讀檔、建圖、傳送資料…) 的執行時間，
+    # 以及共用資料集的記憶體報告
+    show_perf_panel = st.toggle("顯示效能面板", key=perf.PANEL_KEY)
 
 
 # 3. 執行被選擇的頁面
-selected_page.run()
\ No newline at end of file
+perf.start_rerun(selected_page.title)
+try:
+    with perf.span("page.run"):
+        selected_page.run()
+finally:
+    if show_perf_panel:
+        perf.render_panel()
+        # dataset_registry 需要 pandas，只在開啟面板時才載入
+        from dataset_registry import render_memory_report
+        render_memory_report()
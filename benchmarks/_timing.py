@@ -0,0 +1,10 @@
+import timeit
+
+
+def best_of(func, number=100, repeat=5):
+    """回傳 func 單次呼叫的最佳平均時間 (秒)。"""
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+
+def fmt_ms(seconds):
+    return f"{seconds * 1000:.3f} ms"
@@ -0,0 +1,79 @@
+# 比較 Pydeck 圖層三種傳送方式的大小與時間 (10k / 100k / 1M 個點)：
+#   json    : 目前的作法，pdk.Layer(data=DataFrame) + Deck.to_json()
+#   compact : deck_layers.compact_layer + CompactDeck (st.pydeck_chart 可用)
+#   binary  : binary_layer 的 typed array (pydeck widget 的 binary transport，
+#             st.pydeck_chart 不支援，只作為比較的下限)
+# 執行方式 (在專案根目錄)：python -m benchmarks.bench_deck_payload
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pydeck as pdk
+from pydeck.data_utils.binary_transfer import serialize_columns
+
+from deck_layers import CompactDeck, compact_layer, pack_attributes
+
+SIZES = [10_000, 100_000, 1_000_000]
+
+
+def binary_layer(layer_type, packed, elevation_accessor="get_elevation", **props):
+    # 使用 pydeck 的 binary transport 建立圖層 (typed array 不經過 JSON)；
+    # 只有在 Jupyter 等 pydeck widget 環境才有效
+    columns = {"positions": list(packed.positions)}
+    props["get_position"] = "positions"
+    if packed.elevations is not None:
+        columns["elevations"] = packed.elevations
+        props[elevation_accessor] = "elevations"
+    if packed.colors is not None:
+        columns["colors"] = list(packed.colors)
+        props["get_fill_color"] = "colors"
+    return pdk.Layer(layer_type, pd.DataFrame(columns), use_binary_transport=True, **props)
+
+
+def make_points(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "lon": 120.2 + rng.random(n) * 0.5,
+        "lat": 22.5 + rng.random(n) * 0.5,
+        "elevation": rng.random(n) * 3000,
+    })
+
+
+def json_path(df):
+    layer = pdk.Layer("ColumnLayer", data=df, get_position="[lon, lat]", get_elevation="elevation")
+    return len(pdk.Deck(layers=[layer]).to_json().encode())
+
+
+def compact_path(df):
+    packed = pack_attributes(df, "lon", "lat", "elevation")
+    layer = compact_layer("ColumnLayer", packed)
+    return len(CompactDeck(layers=[layer]).to_json().encode())
+
+
+def binary_path(df):
+    packed = pack_attributes(df, "lon", "lat", "elevation")
+    layer = binary_layer("ColumnLayer", packed)
+    buffers = serialize_columns(layer.get_binary_data())
+    attrs = buffers[layer.id]["attributes"].values()
+    return len(pdk.Deck(layers=[layer]).to_json().encode()) + sum(a["value"].nbytes for a in attrs)
+
+
+def measure(path, df):
+    start = time.perf_counter()
+    size = path(df)
+    return size, time.perf_counter() - start
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or SIZES
+    print(f"{'points':>10s} {'path':>8s} {'payload':>12s} {'time':>10s}")
+    for n in sizes:
+        df = make_points(n)
+        for name, path in (("json", json_path), ("compact", compact_path), ("binary", binary_path)):
+            size, seconds = measure(path, df)
+            print(f"{n:>10d} {name:>8s} {size / 2**20:>9.2f} MB {seconds * 1000:>7.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
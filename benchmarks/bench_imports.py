@@ -0,0 +1,77 @@
+# 量測冷啟動的匯入成本：
+#   1. 每個重量級套件單獨匯入的時間 (python -X importtime)
+#   2. 每個頁面實際執行後載入了哪些重量級套件，以及花費的時間
+# 每項量測都在全新的子行程中執行。
+# 執行方式 (在專案根目錄)：python -m benchmarks.bench_imports
+import json
+import subprocess
+import sys
+
+HEAVY_MODULES = [
+    "streamlit", "pandas", "numpy", "pyarrow", "pydeck",
+    "plotly.graph_objects", "plotly.express",
+    "rasterio", "xarray", "geopandas", "localtileserver",
+]
+
+PAGES = ["page_home.py", "page_3Dmap-1.py", "page_3Dmap-2.py"]
+
+_PAGE_CHILD = r"""
+import json, sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+base = set(sys.modules)
+at = AppTest.from_file(sys.argv[1], default_timeout=120)
+at.secrets["MAPBOX_API_KEY"] = "benchmark"
+at.run()
+seconds = time.perf_counter() - start
+heavy = json.loads(sys.argv[2])
+print(json.dumps({
+    "seconds": seconds,
+    "loaded": [m for m in heavy if m in sys.modules and m not in base],
+}))
+"""
+
+
+def import_seconds(module):
+    """單獨匯入 module 的累計時間 (秒)；沒有安裝時回傳 None。"""
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True,
+    )
+    if out.returncode != 0:
+        return None
+    for line in reversed(out.stderr.splitlines()):
+        parts = [p.strip() for p in line.split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1]) / 1e6
+    return None
+
+
+def run_page(page):
+    out = subprocess.run(
+        [sys.executable, "-c", _PAGE_CHILD, page, json.dumps(HEAVY_MODULES)],
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    print("== 單一套件匯入時間 ==")
+    timings = {}
+    for module in HEAVY_MODULES:
+        timings[module] = import_seconds(module)
+        shown = "未安裝" if timings[module] is None else f"{timings[module] * 1000:8.1f} ms"
+        print(f"{module:22s} {shown}")
+
+    eager = sum(t for m, t in timings.items() if t is not None and m != "streamlit")
+    print(f"\n若全部在 app.py 預先匯入：約 {eager * 1000:.0f} ms (不含 streamlit，未扣除重疊)")
+
+    print("\n== 各頁面實際載入的重量級套件 ==")
+    for page in PAGES:
+        result = run_page(page)
+        loaded = ", ".join(result["loaded"]) or "(無)"
+        print(f"{page:18s} {result['seconds'] * 1000:8.1f} ms  {loaded}")
+
+
+if __name__ == "__main__":
+    main()
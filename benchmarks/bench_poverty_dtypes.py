@@ -0,0 +1,58 @@
+# 比較貧窮資料「原本的型別」(pd.read_csv 推斷的字串、int64、float64) 與 SCHEMA 型別的記憶體用量
+# 兩邊都是清理後的 df_countries，以 memory_usage(deep=True) 計算 (包含字串內容)
+# 執行方式 (在專案根目錄)：python -m benchmarks.bench_poverty_dtypes
+import tracemalloc
+
+import pandas as pd
+
+from poverty_data import DATA_COLUMN, clean_poverty_data, read_raw_csv
+
+CSV_FILE = "share-of-population-in-extreme-poverty.csv"
+
+
+def legacy_clean(df_raw):
+    # 改版前的 clean_poverty_data：先完整複製一份，再逐步篩選
+    df_clean = df_raw.copy()
+    df_clean['Year'] = pd.to_numeric(df_clean['Year'], errors='coerce')
+    df_clean = df_clean.dropna(subset=['Year'])
+    df_clean['Year'] = df_clean['Year'].astype(int)
+    df_clean = df_clean.dropna(subset=['Code'])
+    return df_clean[df_clean['Code'].str.len() == 3].copy()
+
+
+def load(before):
+    # 回傳 (df_countries, 讀檔 + 清理過程中的記憶體峰值)
+    tracemalloc.start()
+    if before:
+        df = legacy_clean(pd.read_csv(CSV_FILE))
+    else:
+        df = clean_poverty_data(read_raw_csv(CSV_FILE))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return df, peak
+
+
+def main():
+    df_before, peak_before = load(before=True)
+    df_after, peak_after = load(before=False)
+    assert len(df_before) == len(df_after)
+    # float32 只影響第 7 位有效數字之後
+    assert ((df_before[DATA_COLUMN] - df_after[DATA_COLUMN]).abs().max() or 0) < 1e-4
+
+    usage = pd.DataFrame({
+        "before dtype": df_before.dtypes.astype(str),
+        "before KiB": df_before.memory_usage(deep=True, index=False) / 1024,
+        "after dtype": df_after.dtypes.astype(str),
+        "after KiB": df_after.memory_usage(deep=True, index=False) / 1024,
+    })
+    print(f"rows={len(df_after)}")
+    print(usage.round(1).to_string())
+    total_before = df_before.memory_usage(deep=True).sum()
+    total_after = df_after.memory_usage(deep=True).sum()
+    print(f"total (deep)     : {total_before / 2**20:6.2f} MiB -> {total_after / 2**20:6.2f} MiB "
+          f"({total_before / total_after:.1f}x smaller)")
+    print(f"load traced peak : {peak_before / 2**20:6.2f} MiB -> {peak_after / 2**20:6.2f} MiB")
+
+
+if __name__ == "__main__":
+    main()
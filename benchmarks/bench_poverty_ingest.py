@@ -0,0 +1,68 @@
+# 比較「直接解析 CSV」與「讀取 Parquet 副本」的啟動時間與記憶體
+# 每種方式都在獨立的子行程中執行，量測的是一個全新 server 行程的成本
+# 執行方式 (在專案根目錄)：python -m benchmarks.bench_poverty_ingest
+import json
+import subprocess
+import sys
+
+from poverty_data import DATA_COLUMN, ingest_poverty_csv
+
+CSV_FILE = "share-of-population-in-extreme-poverty.csv"
+COLUMNS = ["Entity", "Code", "Year", DATA_COLUMN, "Population (historical)"]
+
+_CHILD = r"""
+import json, os, sys, time, tracemalloc
+import pandas as pd
+import poverty_data
+
+def rss_kb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+
+mode, csv_file, columns = sys.argv[1], sys.argv[2], json.loads(sys.argv[3])
+rss_before = rss_kb()
+tracemalloc.start()
+start = time.perf_counter()
+if mode == "csv":
+    # 原本的作法：整個 CSV 以預設型別解析後再清理
+    df = poverty_data.clean_poverty_data(pd.read_csv(csv_file))
+    df = df.dropna(subset=[poverty_data.DATA_COLUMN])[columns]
+else:
+    df = poverty_data.read_poverty_table(csv_file, columns)
+seconds = time.perf_counter() - start
+_, traced_peak = tracemalloc.get_traced_memory()
+rss_after = rss_kb()
+print(json.dumps({
+    "seconds": seconds,
+    "rows": len(df),
+    "frame_bytes": int(df.memory_usage(deep=True).sum()),
+    "traced_peak_bytes": traced_peak,
+    "rss_delta_kb": rss_after - rss_before,
+}))
+"""
+
+
+def run(mode):
+    out = subprocess.run(
+        [sys.executable, "-c", _CHILD, mode, CSV_FILE, json.dumps(COLUMNS)],
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    ingest_poverty_csv(CSV_FILE)  # 先建立副本，之後量測的是「之後的啟動」
+    results = {mode: run(mode) for mode in ("csv", "sidecar")}
+    for mode, r in results.items():
+        print(f"{mode:8s} load={r['seconds'] * 1000:8.2f} ms  rows={r['rows']:6d}  "
+              f"frame={r['frame_bytes'] / 1024:8.1f} KiB  "
+              f"traced peak={r['traced_peak_bytes'] / 2**20:7.1f} MiB  "
+              f"RSS delta={r['rss_delta_kb'] / 1024:7.1f} MiB")
+    csv, side = results["csv"], results["sidecar"]
+    print(f"startup speedup: {csv['seconds'] / side['seconds']:.1f}x, "
+          f"traced peak saved: {(csv['traced_peak_bytes'] - side['traced_peak_bytes']) / 2**20:.1f} MiB, "
+          f"RSS saved: {(csv['rss_delta_kb'] - side['rss_delta_kb']) / 1024:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
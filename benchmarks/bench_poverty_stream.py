@@ -0,0 +1,85 @@
+# 以合成的大型 OWID 格式 CSV (多個指標欄位 × 國家 × 年份) 比較
+# 「整份讀進來再清理」與「逐批篩選 + 串流寫入 Parquet」的時間與記憶體峰值
+# 每種方式都在獨立的子行程中執行，記憶體峰值取自 /proc/self/status 的 VmHWM
+# (ru_maxrss 在 fork + exec 後會沿用父行程的值，不能用)
+# 執行方式 (在專案根目錄)：python -m benchmarks.bench_poverty_stream [列數]
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from poverty_data import DATA_COLUMN, POPULATION_COLUMN, REGION_COLUMN
+
+N_ROWS = 2_000_000
+N_EXTRA_INDICATORS = 8
+
+_CHILD = r"""
+import json, sys, time
+import poverty_data
+
+def peak_rss_kb():
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith("VmHWM:"))
+
+mode, csv_file, sidecar_dir = sys.argv[1:4]
+start = time.perf_counter()
+if mode == "whole":
+    df = poverty_data.clean_poverty_data(poverty_data.read_raw_csv(csv_file))
+    rows = int(df[poverty_data.DATA_COLUMN].notna().sum())
+else:
+    path = poverty_data.ingest_poverty_csv(csv_file, sidecar_dir)
+    import pyarrow.parquet as pq
+    rows = pq.ParquetFile(path).metadata.num_rows
+print(json.dumps({
+    "seconds": time.perf_counter() - start,
+    "rows": rows,
+    "peak_rss_kb": peak_rss_kb(),
+}))
+"""
+
+
+def write_synthetic_csv(path, n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    # 3 位代碼的國家與 OWID_ 開頭的地區混在一起，約一半的列沒有貧窮數據
+    codes = np.array([f"C{i:02d}" for i in range(80)] + [f"OWID_R{i}" for i in range(20)])
+    code = codes[rng.integers(0, len(codes), n_rows)]
+    share = rng.uniform(0, 80, n_rows)
+    share[rng.random(n_rows) < 0.5] = np.nan
+    df = pd.DataFrame({
+        "Entity": np.char.add("Entity ", code),
+        "Code": code,
+        "Year": rng.integers(-10000, 2025, n_rows),
+        DATA_COLUMN: share,
+        POPULATION_COLUMN: rng.integers(1_000, 1_000_000_000, n_rows),
+        REGION_COLUMN: np.where(rng.random(n_rows) < 0.1, "Asia", ""),
+        **{f"Indicator {i}": rng.random(n_rows) for i in range(N_EXTRA_INDICATORS)},
+    })
+    df.to_csv(path, index=False)
+
+
+def run(mode, csv_file, sidecar_dir):
+    out = subprocess.run(
+        [sys.executable, "-c", _CHILD, mode, csv_file, sidecar_dir],
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else N_ROWS
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_file = os.path.join(tmp, "synthetic-poverty.csv")
+        write_synthetic_csv(csv_file, n_rows)
+        print(f"rows={n_rows}  csv={os.path.getsize(csv_file) / 2**20:.0f} MiB")
+        for mode in ("whole", "stream"):
+            r = run(mode, csv_file, tmp)
+            print(f"{mode:7s} time={r['seconds']:7.2f} s  kept rows={r['rows']:8d}  "
+                  f"peak RSS={r['peak_rss_kb'] / 1024:8.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
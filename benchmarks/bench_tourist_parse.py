@@ -0,0 +1,74 @@
+# 以 10 萬個景點的「屬性為列、景點為欄」CSV 比較兩種讀取方式：
+#   transpose: 原本的 read_csv(index_col=0).T + 三次 pd.to_numeric
+#   typed    : spatial_table 直接把數值列解析成 float 陣列，最後一次組成 DataFrame
+# 執行方式 (在專案根目錄)：python -m benchmarks.bench_tourist_parse [景點數]
+import os
+import sys
+import tempfile
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from benchmarks._timing import best_of, fmt_ms
+from spatial_table import _build
+
+N_PLACES = 100_000
+N_EXTRA_ROWS = 5      # 頁面用不到的其他屬性列 (例如地址、電話…)
+
+
+def write_wide_csv(path, n_places, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = {
+        "lat": np.round(rng.uniform(22.4, 23.3, n_places), 6).astype(str),
+        "lon": np.round(rng.uniform(120.1, 120.9, n_places), 6).astype(str),
+        "遊客人數": rng.integers(1_000, 10_000_000, n_places).astype(str),
+        **{f"屬性{i}": np.char.add("文字", np.arange(n_places).astype(str)) for i in range(N_EXTRA_ROWS)},
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("景點名稱," + ",".join(f"景點{i}" for i in range(n_places)) + "\n")
+        for name, values in rows.items():
+            f.write(name + "," + ",".join(values) + "\n")
+
+
+def transpose_path(path):
+    # 改版前 tourist_data._load_transposed 的作法
+    data_raw = pd.read_csv(path, index_col=0)
+    data = data_raw.T.reset_index().rename(columns={"index": "景點名稱"})
+    for col in ("lat", "lon", "遊客人數"):
+        data[col] = pd.to_numeric(data[col], errors="coerce")
+    return data.dropna(subset=["lat", "lon", "遊客人數"])
+
+
+def typed_path(path):
+    return _build(path, "lat", "lon", ("遊客人數",), "景點名稱", "wide").frame
+
+
+def traced_peak(func):
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    n_places = int(sys.argv[1]) if len(sys.argv) > 1 else N_PLACES
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "wide.csv")
+        write_wide_csv(path, n_places)
+
+        old, new = transpose_path(path), typed_path(path)
+        assert len(old) == len(new) == n_places
+        assert np.allclose(old["lat"].to_numpy(), new["lat"].to_numpy())
+        assert np.allclose(old["遊客人數"].to_numpy(), new["遊客人數"].to_numpy())
+
+        print(f"places={n_places}  csv={os.path.getsize(path) / 2**20:.1f} MiB")
+        for name, func in (("transpose", transpose_path), ("typed", typed_path)):
+            seconds = best_of(lambda: func(path), number=1, repeat=3)
+            peak = traced_peak(lambda: func(path))
+            print(f"{name:9s} time={fmt_ms(seconds):>14s}  traced peak={peak / 2**20:7.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
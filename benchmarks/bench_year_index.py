@@ -0,0 +1,36 @@
+# 比較「布林遮罩 + dropna」與「年份索引」切換年份的成本
+# 執行方式 (在專案根目錄)：python -m benchmarks.bench_year_index
+from benchmarks._timing import best_of, fmt_ms
+from poverty_data import DATA_COLUMN, build_year_index, clean_poverty_data, read_raw_csv
+
+CSV_FILE = "share-of-population-in-extreme-poverty.csv"
+
+
+def mask_lookup(df_countries, year):
+    df_year_data = df_countries[df_countries['Year'] == year]
+    return df_year_data.dropna(subset=[DATA_COLUMN])
+
+
+def main():
+    df_countries = clean_poverty_data(read_raw_csv(CSV_FILE))
+    build_seconds = best_of(lambda: build_year_index(df_countries), number=5)
+    year_index = build_year_index(df_countries)
+    years = year_index.years()
+
+    # 確認兩種方式取得的資料相同
+    for year in years:
+        expected = mask_lookup(df_countries, year)
+        assert year_index.get(year).index.sort_values().equals(expected.index.sort_values())
+
+    mask_seconds = best_of(lambda: [mask_lookup(df_countries, y) for y in years], number=5)
+    index_seconds = best_of(lambda: [year_index.get(y) for y in years], number=5)
+
+    print(f"rows={len(df_countries)}  years={len(years)}")
+    print(f"build index (一次)    : {fmt_ms(build_seconds)}")
+    print(f"mask + dropna / year  : {fmt_ms(mask_seconds / len(years))}")
+    print(f"year index   / year   : {fmt_ms(index_seconds / len(years))}")
+    print(f"speedup               : {mask_seconds / index_seconds:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# 確認 LabelSelector 保留的標籤方框在每個 zoom 層級都兩兩不相交，
+# 而且被捨棄的標籤都至少與一個優先度更高、已保留的標籤重疊 (不會白白丟掉)
+# 執行方式 (在專案根目錄)：python -m benchmarks.check_label_select
+import numpy as np
+
+from label_select import LabelSelector
+from spatial_index import GridIndex
+from viewport import world_pixels
+
+SEED = 0
+N_POIS = 5_000
+ZOOMS = (8, 10, 12, 14, 16)
+
+# 高雄附近的範圍
+EXTENT = (120.2, 22.5, 120.9, 23.3)
+
+
+def overlapping_pairs(selector, x, y, positions):
+    """回傳 positions 中方框相交的標籤組 (i, j)；以 GridIndex 找出鄰近的候選再精確比對。"""
+    w, h = selector.cell_width, selector.cell_height
+    index = GridIndex(x[positions], y[positions])
+    pairs = []
+    for a, (px, py) in enumerate(zip(x[positions], y[positions])):
+        for b in index.query((px - w, py - h, px + w, py + h)):
+            if b > a and abs(px - x[positions[b]]) < w and abs(py - y[positions[b]]) < h:
+                pairs.append((positions[a], positions[b]))
+    return pairs
+
+
+def main():
+    rng = np.random.default_rng(SEED)
+    min_lon, min_lat, max_lon, max_lat = EXTENT
+    lon = rng.uniform(min_lon, max_lon, N_POIS)
+    lat = rng.uniform(min_lat, max_lat, N_POIS)
+    priority = rng.integers(0, 100_000, N_POIS).astype(np.float64)
+    priority[::50] = np.nan
+    texts = [f"景點{i}" * int(rng.integers(1, 4)) for i in range(N_POIS)]
+    selector = LabelSelector(lon, lat, priority, texts)
+    order = np.argsort(-np.nan_to_num(priority, nan=-np.inf), kind="stable")
+    rank_of = np.empty(N_POIS, dtype=np.int64)
+    rank_of[order] = np.arange(N_POIS)
+
+    for zoom in ZOOMS:
+        kept = selector.select(zoom)
+        x, y = world_pixels(lon, lat, zoom)
+        pairs = overlapping_pairs(selector, x, y, kept)
+        assert not pairs, f"zoom {zoom}: {len(pairs)} 組保留的標籤互相重疊，例如 {pairs[:3]}"
+
+        # 每個被捨棄的標籤都要有一個排名更前面、已保留且重疊的標籤
+        dropped = np.setdiff1d(np.arange(N_POIS), kept)
+        kept_index = GridIndex(x[kept], y[kept])
+        w, h = selector.cell_width, selector.cell_height
+        for i in dropped:
+            near = kept[kept_index.query((x[i] - w, y[i] - h, x[i] + w, y[i] + h))]
+            near = near[(np.abs(x[near] - x[i]) < w) & (np.abs(y[near] - y[i]) < h)]
+            assert (rank_of[near] < rank_of[i]).any(), f"zoom {zoom}: 標籤 {i} 不該被捨棄"
+        print(f"zoom {zoom:2d}  保留 {len(kept):5d} / {N_POIS} 個標籤，沒有任何方框相交")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# 以隨機的存取序列比對 FigureCache 與 DiskTileCache 的淘汰順序和一個簡單的參考 LRU
+# (串列 + 總大小)：每一步之後快取中的 key (由舊到新)、已用大小與命中次數都必須相同。
+# 執行方式 (在專案根目錄)：python -m benchmarks.check_lru_caches
+import os
+import tempfile
+
+import numpy as np
+
+from figure_cache import FigureCache
+from tile_server import DiskTileCache
+
+SEED = 0
+N_STEPS = 3_000
+N_KEYS = 60
+BUDGET_BYTES = 20_000
+
+
+class ReferenceLRU:
+    """最直接的 LRU：keys 由舊到新，超過預算時從頭刪除；大於預算的項目不放入。"""
+
+    def __init__(self, budget_bytes):
+        self.budget_bytes = budget_bytes
+        self.keys = []
+        self.sizes = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        if key in self.sizes:
+            self.keys.remove(key)
+            self.keys.append(key)
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def put(self, key, size, skip_oversized=True):
+        if key in self.sizes:
+            self.keys.remove(key)
+        elif skip_oversized and size > self.budget_bytes:
+            return
+        self.keys.append(key)
+        self.sizes[key] = size
+        while sum(self.sizes[k] for k in self.keys) > self.budget_bytes:
+            del self.sizes[self.keys.pop(0)]
+
+    @property
+    def used_bytes(self):
+        return sum(self.sizes.values())
+
+
+class FakeFigure:
+    def __init__(self, size):
+        self.size = size
+
+    def to_json(self):
+        return "x" * self.size
+
+
+def check_figure_cache(rng, key_sizes):
+    cache = FigureCache(BUDGET_BYTES)
+    reference = ReferenceLRU(BUDGET_BYTES)
+    builds = []
+    for key in rng.integers(0, N_KEYS, N_STEPS):
+        key = int(key)
+        fig = cache.get_or_build(key, lambda: builds.append(key) or FakeFigure(key_sizes[key]))
+        assert fig.size == key_sizes[key]
+        if not reference.get(key):
+            assert builds[-1] == key
+            reference.put(key, key_sizes[key])
+        assert list(cache._entries) == reference.keys
+        assert cache.used_bytes == reference.used_bytes <= BUDGET_BYTES
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (reference.hits, reference.misses)
+    assert len(builds) == reference.misses
+    print(f"FigureCache              {N_STEPS} 次存取與參考 LRU 相同 "
+          f"(命中 {stats['hits']}，淘汰 {stats['evictions']})")
+
+
+def check_disk_tile_cache(rng, key_sizes):
+    with tempfile.TemporaryDirectory() as root:
+        cache = DiskTileCache(root, BUDGET_BYTES)
+        reference = ReferenceLRU(BUDGET_BYTES)
+        for key in rng.integers(0, N_KEYS, N_STEPS):
+            name = f"tif-00000000/1/elevation/10/{int(key) % 7}/{int(key)}.png"
+            data = cache.get(name)
+            if reference.get(name):
+                assert data == bytes([key % 256]) * key_sizes[key]
+            else:
+                assert data is None
+                # DiskTileCache 會先放入再淘汰，所以大於預算的圖磚也會把其他圖磚擠掉
+                cache.put(name, bytes([key % 256]) * key_sizes[key])
+                reference.put(name, key_sizes[key], skip_oversized=False)
+            assert list(cache._entries) == reference.keys
+            assert cache.used_bytes == reference.used_bytes
+
+        # 磁碟上的檔案與記錄一致，重新開啟時也能沿用
+        on_disk = {
+            os.path.relpath(os.path.join(dirpath, name), root)
+            for dirpath, _, names in os.walk(root) for name in names
+        }
+        assert on_disk == set(reference.keys)
+        reopened = DiskTileCache(root, BUDGET_BYTES)
+        assert set(reopened._entries) == set(reference.keys)
+        assert reopened.used_bytes == reference.used_bytes
+
+        # drop_prefix 只刪除該前綴的圖磚
+        reopened.drop_prefix("tif-00000000/1/elevation/10/3/")
+        remaining = [k for k in reference.keys if not k.startswith("tif-00000000/1/elevation/10/3/")]
+        assert set(reopened._entries) == set(remaining)
+        assert all(os.path.exists(os.path.join(root, k)) == (k in remaining) for k in reference.keys)
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"]) == (reference.hits, reference.misses)
+    print(f"DiskTileCache            {N_STEPS} 次存取與參考 LRU 相同 "
+          f"(命中 {stats['hits']}，淘汰 {stats['evictions']})")
+
+
+def main():
+    rng = np.random.default_rng(SEED)
+    # 大部分項目遠小於預算，少數幾個接近或超過預算
+    key_sizes = rng.integers(200, 3_000, N_KEYS)
+    key_sizes[:3] = [BUDGET_BYTES - 1, BUDGET_BYTES, BUDGET_BYTES + 1]
+    key_sizes = [int(size) for size in key_sizes]
+    check_figure_cache(rng, key_sizes)
+    check_disk_tile_cache(rng, key_sizes)
+
+
+if __name__ == "__main__":
+    main()
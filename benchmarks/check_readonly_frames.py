@@ -0,0 +1,64 @@
+# 確認放進共用登錄表的 DataFrame 每個欄位都拒絕就地寫入，而且內容與原本相同
+# (涵蓋 float / int / bool、類別、pandas 3 的 str 與可為缺值的 Int64 欄位，
+#  以及 app 實際共用的景點表與貧窮資料表)
+# 執行方式 (在專案根目錄)：python -m benchmarks.check_readonly_frames
+import numpy as np
+import pandas as pd
+
+from dataset_registry import freeze, readonly_frame
+from poverty_data import _build_poverty_dataset
+from spatial_table import _build, file_signature
+
+CSV_FILE = "share-of-population-in-extreme-poverty.csv"
+TOURIST_FILE = "kaohsiung_tourist.csv"
+
+
+def assert_readonly(df, label):
+    for column in df.columns:
+        value = df[column].iloc[-1]
+        before = df[column].iloc[0]
+        writes = [
+            lambda: df.loc.__setitem__((df.index[0], column), value),
+            lambda: df.iloc.__setitem__((0, df.columns.get_loc(column)), value),
+        ]
+        for write in writes:
+            try:
+                write()
+            except (ValueError, TypeError):
+                pass
+            else:
+                raise AssertionError(f"{label}: 欄位 {column!r} 可以被寫入")
+        after = df[column].iloc[0]
+        assert before == after or (pd.isna(before) and pd.isna(after)), column
+        # NumPy 型別的欄位 to_numpy() 不會複製，拿到的陣列也必須是唯讀的
+        values = df[column].to_numpy()
+        if isinstance(df[column].dtype, np.dtype) and values.size:
+            assert not values.flags.writeable, f"{label}: {column!r} 的陣列可以被寫入"
+    print(f"{label:24s} {len(df.columns)} 個欄位皆為唯讀 ({len(df)} 列)")
+
+
+def main():
+    sample = pd.DataFrame({
+        "float": [1.5, 2.5, np.nan],
+        "int": [1, 2, 3],
+        "bool": [True, False, True],
+        "category": pd.Categorical(["a", "b", "a"]),
+        "str": ["x", None, "z"],
+        "nullable": pd.array([1, None, 3], dtype="Int64"),
+    })
+    frozen = readonly_frame(sample)
+    pd.testing.assert_frame_equal(frozen, sample, check_dtype=False)
+    assert_readonly(frozen, "各種型別")
+
+    abs_path = file_signature(TOURIST_FILE)[0]
+    table = freeze(_build(abs_path, "lat", "lon", ("遊客人數",), "景點名稱", "auto"))
+    assert_readonly(table.frame, "景點表 (SpatialTable)")
+
+    for value in freeze(_build_poverty_dataset(CSV_FILE, None)):
+        frame = getattr(value, "frame", value)
+        if isinstance(frame, pd.DataFrame):
+            assert_readonly(frame, f"貧窮資料 ({type(value).__name__})")
+
+
+if __name__ == "__main__":
+    main()
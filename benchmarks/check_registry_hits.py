@@ -0,0 +1,61 @@
+# 確認共用資料集登錄表回報的 built (LoadTiming.cache_hit = not built) 只反映這次呼叫：
+#   - 多個 session 同時要求同一個資料集時，只有真正建立的那一次 built=True
+#   - 其他資料集正在建立時，已快取的資料集仍然回報命中
+# 執行方式 (在專案根目錄)：python -m benchmarks.check_registry_hits
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from dataset_registry import DatasetRegistry
+
+N_SESSIONS = 16
+BUILD_SECONDS = 0.2
+
+
+def slow_build(value, started=None):
+    def build():
+        if started is not None:
+            started.set()
+        time.sleep(BUILD_SECONDS)
+        return value
+    return build
+
+
+def check_concurrent_same_dataset():
+    registry = DatasetRegistry()
+    with ThreadPoolExecutor(N_SESSIONS) as pool:
+        results = list(pool.map(
+            lambda _: registry.fetch("a", 1, slow_build("A")), range(N_SESSIONS)
+        ))
+    assert all(value == "A" for value, _ in results)
+    assert sum(built for _, built in results) == 1, results
+    # 版本改變時重新建立一次，之後又是命中
+    assert registry.fetch("a", 2, slow_build("A2")) == ("A2", True)
+    assert registry.fetch("a", 2, slow_build("A3")) == ("A2", False)
+    print(f"同一個資料集          {N_SESSIONS} 個 session 同時要求，只有 1 次 built")
+
+
+def check_hit_during_other_build():
+    registry = DatasetRegistry()
+    assert registry.fetch("a", 1, slow_build("A")) == ("A", True)
+    started = threading.Event()
+    other = threading.Thread(target=registry.fetch, args=("b", 1, slow_build("B", started)))
+    other.start()
+    started.wait()
+    # 「b」正在建立 (其他 session)；「a」這次仍然是命中，也不會等「b」建立完成
+    start = time.perf_counter()
+    value, built = registry.fetch("a", 1, slow_build("A again"))
+    elapsed = time.perf_counter() - start
+    other.join()
+    assert (value, built) == ("A", False)
+    assert elapsed < BUILD_SECONDS / 2, elapsed
+    print(f"其他資料集建立中      已快取的資料集回報命中 ({elapsed * 1000:.2f} ms)")
+
+
+def main():
+    check_concurrent_same_dataset()
+    check_hit_during_other_build()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# 把空間索引與分箱的結果和暴力法逐一比對：
+#   GridIndex.query        vs 對所有點做範圍遮罩
+#   ClusterPyramid 各層    vs 直接把每個點分到該層的格子再 groupby 加總
+#                             (同一個格子在任何範圍查詢中的柱高都相同)
+#   aggregate_cells        vs pandas groupby (mean / max / sum)
+# 執行方式 (在專案根目錄)：python -m benchmarks.check_spatial_index
+import numpy as np
+import pandas as pd
+
+from dem_grid import aggregate_cells, cell_steps
+from poi_clusters import ClusterPyramid
+from spatial_index import GridIndex
+
+SEED = 0
+N_POINTS = 20_000
+N_QUERIES = 500
+
+# 高雄附近的範圍
+EXTENT = (120.2, 22.5, 120.9, 23.3)
+
+
+def random_points(rng, n):
+    """一半均勻分布、一半集中在幾個熱點，並混入重複的座標與剛好在範圍邊界上的點。"""
+    min_lon, min_lat, max_lon, max_lat = EXTENT
+    n_uniform = n // 2
+    lon = rng.uniform(min_lon, max_lon, n_uniform)
+    lat = rng.uniform(min_lat, max_lat, n_uniform)
+    centers = rng.uniform([min_lon, min_lat], [max_lon, max_lat], (8, 2))
+    hot = centers[rng.integers(0, len(centers), n - n_uniform)] + rng.normal(0, 0.01, (n - n_uniform, 2))
+    lon = np.clip(np.concatenate([lon, hot[:, 0]]), min_lon, max_lon)
+    lat = np.clip(np.concatenate([lat, hot[:, 1]]), min_lat, max_lat)
+    lon[:20], lat[:20] = lon[20:40], lat[20:40]
+    lon[40:44] = [min_lon, max_lon, min_lon, max_lon]
+    lat[40:44] = [min_lat, min_lat, max_lat, max_lat]
+    return lon, lat
+
+
+def random_bounds(rng):
+    min_lon, min_lat, max_lon, max_lat = EXTENT
+    pad = 0.2
+    a = rng.uniform([min_lon - pad, min_lat - pad], [max_lon + pad, max_lat + pad], (2, 2))
+    (x0, y0), (x1, y1) = np.sort(a, axis=0)
+    return x0, y0, x1, y1
+
+
+def check_grid_index(rng, lon, lat):
+    index = GridIndex(lon, lat)
+    queries = [random_bounds(rng) for _ in range(N_QUERIES)]
+    queries += [EXTENT, (lon[0], lat[0], lon[0], lat[0]), (0, 0, 1, 1)]
+    for bounds in queries:
+        min_lon, min_lat, max_lon, max_lat = bounds
+        expected = np.flatnonzero(
+            (lon >= min_lon) & (lon <= max_lon) & (lat >= min_lat) & (lat <= max_lat)
+        )
+        np.testing.assert_array_equal(index.query(bounds), expected, err_msg=str(bounds))
+
+    # 沒有點與只有一個點的索引
+    assert len(GridIndex([], []).query(EXTENT)) == 0
+    np.testing.assert_array_equal(GridIndex([120.5], [23.0]).query(EXTENT), [0])
+    print(f"GridIndex.query          {len(queries)} 個範圍皆與暴力遮罩相同 ({len(lon)} 點)")
+
+
+def check_cluster_pyramid(rng, lon, lat, weight):
+    pyramid = ClusterPyramid(lon, lat, weight)
+    lon_step, lat_step = cell_steps(pyramid.base_cell_size, pyramid.extent)
+    col = np.floor((lon - pyramid.extent[0]) / lon_step).astype(np.int64)
+    row = np.floor((lat - pyramid.extent[1]) / lat_step).astype(np.int64)
+    for level in range(pyramid.n_levels):
+        # 暴力法：每個點直接分到第 level 層的格子
+        expected = (
+            pd.DataFrame({"col": col // 2 ** level, "row": row // 2 ** level,
+                          "weight": weight, "count": 1})
+            .groupby(["col", "row"], as_index=False).sum()
+        )
+        cells = pyramid.levels[level]
+        actual = pd.DataFrame({k: cells[k] for k in ("col", "row", "weight", "count")})
+        actual = actual.sort_values(["col", "row"], ignore_index=True)
+        pd.testing.assert_frame_equal(actual, expected, check_dtype=False, obj=f"第 {level} 層")
+        assert actual["count"].sum() == len(lon)
+
+        # 柱高只依層級換算：部分範圍查到的格子與整個範圍的同一格高度相同
+        full = pyramid.cells(level).set_index(["lon", "lat"])["elevation"]
+        for _ in range(20):
+            part = pyramid.cells(level, random_bounds(rng)).set_index(["lon", "lat"])["elevation"]
+            pd.testing.assert_series_equal(part, full.loc[part.index], obj=f"第 {level} 層柱高")
+    print(f"ClusterPyramid           {pyramid.n_levels} 層皆與直接分箱相同")
+
+
+def check_aggregate_cells(rng, lon, lat):
+    elevation = rng.uniform(-50, 3000, len(lon))
+    elevation[::97] = np.nan
+    for cell_size in (300, 2_000, 25_000):
+        lon_step, lat_step = cell_steps(cell_size, EXTENT)
+        n_cols = max(1, int(np.ceil((EXTENT[2] - EXTENT[0]) / lon_step)))
+        n_rows = max(1, int(np.ceil((EXTENT[3] - EXTENT[1]) / lat_step)))
+        points = pd.DataFrame({
+            # 剛好落在右/上邊界的點屬於最後一格
+            "col": np.minimum(np.floor((lon - EXTENT[0]) / lon_step), n_cols - 1),
+            "row": np.minimum(np.floor((lat - EXTENT[1]) / lat_step), n_rows - 1),
+            "elevation": elevation,
+        }).dropna()
+        for statistic in ("mean", "max", "sum"):
+            expected = (
+                points.groupby(["row", "col"])["elevation"]
+                .agg([statistic, "count"]).reset_index()
+            )
+            actual = aggregate_cells(lon, lat, elevation, cell_size, EXTENT, statistic)
+            np.testing.assert_allclose(actual["lon"], EXTENT[0] + expected["col"] * lon_step)
+            np.testing.assert_allclose(actual["lat"], EXTENT[1] + expected["row"] * lat_step)
+            np.testing.assert_allclose(actual["elevation"], expected[statistic])
+            np.testing.assert_array_equal(actual["count"], expected["count"])
+
+    # 範圍外的點要被忽略
+    outside = aggregate_cells([0.0, 120.5], [0.0, 23.0], [1.0, 2.0], 2_000, EXTENT)
+    assert outside["count"].tolist() == [1] and outside["elevation"].tolist() == [2.0]
+    # 沒有任何有效的點 (例如整片 nodata) 時回傳空的表格
+    for statistic in ("mean", "max", "sum"):
+        assert aggregate_cells([120.5], [23.0], [np.nan], 2_000, EXTENT, statistic).empty
+        assert aggregate_cells([], [], [], 2_000, EXTENT, statistic).empty
+    print("aggregate_cells          mean / max / sum 皆與 pandas groupby 相同")
+
+
+def main():
+    rng = np.random.default_rng(SEED)
+    lon, lat = random_points(rng, N_POINTS)
+    weight = rng.integers(0, 10_000, N_POINTS).astype(np.float64)
+    check_grid_index(rng, lon, lat)
+    check_cluster_pyramid(rng, lon, lat, weight)
+    check_aggregate_cells(rng, lon, lat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+PAGE_SIZES = (25, 50, 100)
+
+# 每個資料集保留幾組「排序 + 篩選」的結果，換頁時不必重新計算
+QUERY_CACHE_SIZE = 16
+
+
+class TableIndex:
+    """在伺服器端替一個唯讀的 DataFrame 建立排序與篩選用的索引。
+
+    每個欄位的排序順序 (argsort) 在第一次用到時計算並保留；篩選用的小寫字串
+    也只建立一次。query 回傳符合條件的列位置 (已排序)，page 只取出其中一頁，
+    瀏覽器一次只會收到這一頁的資料。
+    """
+
+    def __init__(self, frame):
+        self.frame = frame
+        self._orders = {}
+        self._lowered = {}
+        self._queries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def text_columns(self):
+        return [
+            col for col, dtype in self.frame.dtypes.items()
+            if not pd.api.types.is_numeric_dtype(dtype)
+        ]
+
+    def _order(self, column, ascending):
+        key = (column, ascending)
+        if key not in self._orders:
+            # 以位置 (0..n-1) 為 index 排序；缺值一律排在最後
+            series = self.frame[column].reset_index(drop=True)
+            self._orders[key] = series.sort_values(
+                ascending=ascending, kind="stable", na_position="last"
+            ).index.to_numpy()
+        return self._orders[key]
+
+    def _matches(self, column, text):
+        if column not in self._lowered:
+            self._lowered[column] = self.frame[column].astype(str).str.lower().reset_index(drop=True)
+        return self._lowered[column].str.contains(text.lower(), regex=False).to_numpy()
+
+    def query(self, sort_by=None, ascending=True, filter_column=None, text=""):
+        """回傳符合篩選條件、依 sort_by 排序的列位置。"""
+        key = (sort_by, ascending, filter_column, text)
+        with self._lock:
+            if key in self._queries:
+                self._queries.move_to_end(key)
+                return self._queries[key]
+            positions = self._order(sort_by, ascending) if sort_by else np.arange(len(self.frame))
+            if filter_column and text:
+                positions = positions[self._matches(filter_column, text)[positions]]
+            self._queries[key] = positions
+            if len(self._queries) > QUERY_CACHE_SIZE:
+                self._queries.popitem(last=False)
+            return positions
+
+    def page(self, positions, page, page_size):
+        start = (page - 1) * page_size
+        return self.frame.iloc[positions[start:start + page_size]]
+
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+def table_index(dataset_key, _frame):
+    # 依 dataset_key 快取，所有 session 共用；_frame 以底線開頭，Streamlit 不會對它計算雜湊
+    return TableIndex(_frame)
+
+
+def paged_table(frame, key, dataset_key, columns=None, page_size=PAGE_SIZES[0]):
+    """分頁顯示 frame：排序與篩選在伺服器端完成，只把目前這一頁送到瀏覽器。
+
+    key 用來區分同一頁面上的多個表格 (widget 的 key 前綴)；dataset_key 必須
+    在資料內容改變時跟著改變 (例如檔案版本或資料雜湊)，索引依它快取。
+    """
+    if columns is not None:
+        frame = frame[columns]
+    index = table_index((dataset_key, tuple(frame.columns)), frame)
+
+    text_columns = index.text_columns()
+    sort_col, order_col, filter_col, text_col, size_col = st.columns([3, 2, 3, 4, 2])
+    sort_by = sort_col.selectbox("排序欄位", ["(不排序)", *frame.columns], key=f"{key}_sort")
+    ascending = order_col.radio("順序", ["遞增", "遞減"], key=f"{key}_order", horizontal=True) == "遞增"
+    filter_column = filter_col.selectbox("篩選欄位", text_columns or ["(無)"], key=f"{key}_filter_col")
+    text = text_col.text_input("包含文字", key=f"{key}_filter_text", disabled=not text_columns)
+    page_size = size_col.selectbox(
+        "每頁筆數", PAGE_SIZES, index=PAGE_SIZES.index(page_size), key=f"{key}_page_size"
+    )
+
+    positions = index.query(
+        sort_by=None if sort_by == "(不排序)" else sort_by,
+        ascending=ascending,
+        filter_column=filter_column if text_columns else None,
+        text=text.strip(),
+    )
+    n_pages = max(1, -(-len(positions) // page_size))
+    page_key = f"{key}_page"
+    # 篩選後頁數變少時，回到第一頁 (必須在建立 widget 之前設定)
+    if st.session_state.get(page_key, 1) > n_pages:
+        st.session_state[page_key] = 1
+    page = st.number_input("頁碼", min_value=1, max_value=n_pages, step=1, key=page_key)
+
+    st.dataframe(index.page(positions, page, page_size), hide_index=True)
+    st.caption(f"第 {page} / {n_pages} 頁，共 {len(positions)} 筆 (總共 {len(frame)} 筆)")
@@ -0,0 +1,63 @@
+from dataclasses import dataclass
+
+import numpy as np
+import streamlit as st
+
+from viewport import fit_zoom
+
+# 計算「穩健範圍」時兩端各忽略多少比例的點 (離群值)
+OUTLIER_FRACTION = 0.01
+
+
+@dataclass(frozen=True)
+class DatasetExtent:
+    bounds: tuple          # 所有點的 (min_lon, min_lat, max_lon, max_lat)
+    robust_bounds: tuple   # 忽略兩端 OUTLIER_FRACTION 的點之後的範圍
+    center: tuple          # (緯度, 經度) 中位數，不受離群值影響
+    zoom: float            # 讓 robust_bounds 放進預設畫面的縮放等級
+    count: int
+
+
+def _quantiles(values, fraction):
+    # np.quantile 內部以 partition 實作，不需要完整排序，數百萬筆也很快
+    low, median, high = np.quantile(values, [fraction, 0.5, 1 - fraction])
+    return float(low), float(median), float(high)
+
+
+def compute_extent(lon, lat, outlier_fraction=OUTLIER_FRACTION):
+    """計算點資料的範圍、穩健範圍、中位數中心，以及剛好框住穩健範圍的縮放等級。"""
+    lon = np.asarray(lon, dtype=np.float64)
+    lat = np.asarray(lat, dtype=np.float64)
+    valid = ~(np.isnan(lon) | np.isnan(lat))
+    lon, lat = lon[valid], lat[valid]
+    if len(lon) == 0:
+        raise ValueError("沒有任何有效的座標")
+
+    lon_low, lon_median, lon_high = _quantiles(lon, outlier_fraction)
+    lat_low, lat_median, lat_high = _quantiles(lat, outlier_fraction)
+    robust_bounds = (lon_low, lat_low, lon_high, lat_high)
+    return DatasetExtent(
+        bounds=(float(lon.min()), float(lat.min()), float(lon.max()), float(lat.max())),
+        robust_bounds=robust_bounds,
+        center=(lat_median, lon_median),
+        zoom=fit_zoom(robust_bounds),
+        count=len(lon),
+    )
+
+
+def extent_of_bounds(bounds):
+    """已知範圍的資料集 (例如網格或影像) 直接以範圍中心與 fit_zoom 取景。"""
+    min_lon, min_lat, max_lon, max_lat = bounds
+    return DatasetExtent(
+        bounds=tuple(bounds),
+        robust_bounds=tuple(bounds),
+        center=((min_lat + max_lat) / 2, (min_lon + max_lon) / 2),
+        zoom=fit_zoom(bounds),
+        count=0,
+    )
+
+
+@st.cache_resource(max_entries=16, show_spinner=False)
+def dataset_extent(dataset_key, _lon, _lat):
+    # 每個資料版本只計算一次，所有 session 共用；_lon / _lat 不計算雜湊
+    return compute_extent(_lon, _lat)
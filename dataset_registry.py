@@ -0,0 +1,234 @@
+import sys
+import threading
+import time
+import types
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+# 多久沒有使用某個資料集的 session 就不再計入「使用中」(秒)
+SESSION_IDLE_SECONDS = 10 * 60
+
+
+def _readonly(values):
+    values.flags.writeable = False
+    return values
+
+
+def readonly_array(column):
+    """把一個欄位複製成底層為唯讀 NumPy 陣列的 array，寫入時拋出 ValueError。"""
+    dtype = column.dtype
+    if isinstance(dtype, np.dtype):
+        return _readonly(column.to_numpy(copy=True))
+    if isinstance(dtype, pd.CategoricalDtype):
+        # 類別本身是不可變的 Index，只要把 codes 設成唯讀
+        return pd.Categorical.from_codes(_readonly(column.cat.codes.to_numpy(copy=True)), dtype=dtype)
+    if isinstance(dtype, pd.StringDtype):
+        # Arrow 字串陣列寫入時會換掉內部的陣列 (不會拋錯)，改用 object ndarray 存放的
+        # python 字串陣列；先交給 StringArray 再設成唯讀 (它不接受唯讀的輸入)
+        values = column.to_numpy(dtype=object, na_value=dtype.na_value, copy=True)
+        array = pd.arrays.StringArray(
+            values, dtype=pd.StringDtype("python", na_value=dtype.na_value), copy=False
+        )
+        _readonly(values)
+        return array
+    array = column.array
+    if isinstance(array, (pd.arrays.IntegerArray, pd.arrays.FloatingArray, pd.arrays.BooleanArray)):
+        # 可為缺值的數值欄位：資料與缺值遮罩都設成唯讀
+        mask = column.isna().to_numpy(copy=True)
+        data = array.to_numpy(dtype=dtype.numpy_dtype, na_value=0, copy=True)
+        return type(array)(_readonly(data), _readonly(mask), copy=False)
+    # 其他擴充型別：退回唯讀的 object 陣列 (型別會變成 object)
+    return _readonly(column.to_numpy(dtype=object, copy=True))
+
+
+def readonly_frame(df):
+    """複製一份每個欄位都以唯讀陣列存放的 DataFrame (只在建立時複製一次)。
+
+    之後就地寫入值 (df.loc / df.iloc / .to_numpy() 的陣列) 都會拋出 ValueError，
+    而不會悄悄改到其他 session 的資料；切片 (iloc / 布林篩選) 與一般運算照常可用。
+    注意：新增或取代整個欄位 (df[col] = ...) 仍然會改到這個 DataFrame 物件本身，
+    需要改欄位時請先 copy()。
+    """
+    columns = {name: readonly_array(column) for name, column in df.items()}
+    return pd.DataFrame(columns, index=df.index, copy=False)
+
+
+def freeze(value):
+    """把資料集轉成唯讀：DataFrame / ndarray 設為唯讀，list → tuple，dict → 唯讀 mapping。"""
+    if isinstance(value, pd.DataFrame):
+        return readonly_frame(value)
+    if isinstance(value, np.ndarray):
+        value.flags.writeable = False
+        return value
+    if isinstance(value, (tuple, list)):
+        return tuple(freeze(item) for item in value)
+    if isinstance(value, dict):
+        return types.MappingProxyType({k: freeze(v) for k, v in value.items()})
+    if hasattr(value, "__dict__") and not isinstance(value, type):
+        # 自訂物件 (例如 YearIndex)：凍結它的屬性 (frozen dataclass 也適用)
+        for attr, item in vars(value).items():
+            object.__setattr__(value, attr, freeze(item))
+    return value
+
+
+def deep_nbytes(value):
+    """估計資料在記憶體中佔用的位元組數 (DataFrame 包含字串內容)。"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True, index=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True, index=True))
+    if isinstance(value, np.ndarray):
+        # memory-map 的資料在磁碟上，不算常駐記憶體
+        return 0 if isinstance(value, np.memmap) else value.nbytes
+    if isinstance(value, (tuple, list, set, frozenset)):
+        return sys.getsizeof(value) + sum(deep_nbytes(item) for item in value)
+    if isinstance(value, (dict, types.MappingProxyType)):
+        return sys.getsizeof(value) + sum(deep_nbytes(k) + deep_nbytes(v) for k, v in value.items())
+    if hasattr(value, "__dict__") and not isinstance(value, type):
+        return sys.getsizeof(value) + deep_nbytes(vars(value))
+    return sys.getsizeof(value)
+
+
+@dataclass(frozen=True)
+class SharedDataset:
+    name: str
+    key: tuple             # 資料版本 (例如檔案的 mtime / 大小)；改變時重新建立
+    value: object          # 唯讀的資料集，所有 session 共用同一份
+    nbytes: int
+    build_seconds: float
+    built_at: float
+
+
+class DatasetRegistry:
+    """跨 session 共用的唯讀資料集登錄表。
+
+    與 st.cache_data 不同，取出時不會複製 (不經過 pickle)，每個 session 拿到的
+    都是同一個物件，所以資料集本身必須是唯讀的 (見 freeze)。每個名稱只保留
+    最新版本，key 改變或超過 ttl 時重新建立並取代舊版本。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._build_locks = {}
+        self._entries = {}      # name -> SharedDataset
+        self._sessions = {}     # name -> {session_id: 最後使用時間}
+
+    def get_or_build(self, name, key, build, ttl=None):
+        return self.fetch(name, key, build, ttl)[0]
+
+    def fetch(self, name, key, build, ttl=None):
+        """與 get_or_build 相同，但回傳 (value, built)：built 表示這次呼叫是否自己建立了資料集。"""
+        built = False
+        entry = self._lookup(name, key, ttl)
+        if entry is None:
+            # 同一個資料集同時只建立一次；其他 session 等待後直接取用
+            with self._build_lock(name):
+                entry = self._lookup(name, key, ttl)
+                if entry is None:
+                    entry = self._build(name, key, build)
+                    built = True
+        self._touch(name)
+        return entry.value, built
+
+    def _lookup(self, name, key, ttl):
+        with self._lock:
+            entry = self._entries.get(name)
+        if entry is None or entry.key != key:
+            return None
+        if ttl is not None and time.time() - entry.built_at > ttl:
+            return None
+        return entry
+
+    def _build_lock(self, name):
+        with self._lock:
+            return self._build_locks.setdefault(name, threading.Lock())
+
+    def _build(self, name, key, build):
+        start = time.perf_counter()
+        value = freeze(build())
+        entry = SharedDataset(
+            name=name,
+            key=key,
+            value=value,
+            nbytes=deep_nbytes(value),
+            build_seconds=time.perf_counter() - start,
+            built_at=time.time(),
+        )
+        with self._lock:
+            self._entries[name] = entry
+        return entry
+
+    def _touch(self, name):
+        ctx = get_script_run_ctx()
+        if ctx is None:
+            return
+        now = time.time()
+        with self._lock:
+            seen = self._sessions.setdefault(name, {})
+            seen[ctx.session_id] = now
+            # 只保留最近 SESSION_IDLE_SECONDS 內用過的 session，已結束的 session 不會一直累積
+            for session_id in [sid for sid, t in seen.items() if now - t >= SESSION_IDLE_SECONDS]:
+                del seen[session_id]
+
+    def report(self):
+        """每個資料集一列：常駐大小、建立時間與目前使用中的 session 數。"""
+        now = time.time()
+        with self._lock:
+            entries = list(self._entries.values())
+            sessions = {name: dict(seen) for name, seen in self._sessions.items()}
+        return [
+            {
+                "資料集": entry.name,
+                "常駐大小 (MB)": round(entry.nbytes / 1e6, 2),
+                "建立時間 (ms)": round(entry.build_seconds * 1000, 1),
+                "使用中的 session": sum(
+                    1 for seen in sessions.get(entry.name, {}).values()
+                    if now - seen < SESSION_IDLE_SECONDS
+                ),
+            }
+            for entry in entries
+        ]
+
+    @property
+    def total_bytes(self):
+        with self._lock:
+            return sum(entry.nbytes for entry in self._entries.values())
+
+
+@st.cache_resource(show_spinner=False)
+def registry():
+    return DatasetRegistry()
+
+
+def shared_dataset(name, key, build, ttl=None, return_built=False):
+    """從共用登錄表取出 name 的資料集；不存在或版本 (key) 不同時呼叫 build() 建立。
+
+    return_built=True 時回傳 (value, built)，built 表示這次呼叫是否自己建立了資料集
+    (其他 session 同時建立的不算)。
+    """
+    value, built = registry().fetch(name, key, build, ttl)
+    return (value, built) if return_built else value
+
+
+def session_overhead_bytes():
+    """目前 session 自己持有的資料量 (st.session_state)，不含共用的資料集。"""
+    if get_script_run_ctx() is None:
+        return 0
+    return sum(deep_nbytes(st.session_state[key]) for key in st.session_state)
+
+
+def render_memory_report():
+    """在側邊欄顯示共用資料集的常駐大小，以及這個 session 額外佔用的記憶體。"""
+    with st.sidebar:
+        st.subheader("記憶體報告")
+        rows = registry().report()
+        if rows:
+            st.dataframe(rows, hide_index=True)
+        st.caption(
+            f"共用資料集合計 {registry().total_bytes / 1e6:.2f} MB (所有 session 共用一份)；"
+            f"這個 session 額外佔用約 {session_overhead_bytes() / 1e3:.1f} KB。"
+        )
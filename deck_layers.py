@@ -0,0 +1,82 @@
+import json
+from dataclasses import dataclass, field
+
+import numpy as np
+import pydeck as pdk
+from pydeck.bindings.json_tools import default_serialize
+
+# st.pydeck_chart 只會傳送 Deck.to_json()，所以圖層資料仍然是 JSON 紀錄；
+# typed array 只用來在伺服器端精簡欄位與數值 (見 compact_layer)
+
+# 精簡紀錄使用的短欄位名稱 (accessor 直接引用)
+POSITION_KEY = "p"
+ELEVATION_KEY = "e"
+COLOR_KEY = "c"
+
+
+@dataclass(frozen=True)
+class PackedAttributes:
+    """以連續 typed array 表示的圖層屬性 (deck.gl binary attributes 的格式)。"""
+    length: int
+    positions: np.ndarray                 # float32，形狀 (n, 2)：[經度, 緯度]
+    elevations: np.ndarray | None = None  # float32，形狀 (n,)
+    colors: np.ndarray | None = None      # uint8，形狀 (n, 4)：RGBA
+    extras: dict = field(default_factory=dict)  # tooltip / 文字等其他欄位
+
+    @property
+    def nbytes(self):
+        arrays = [self.positions, self.elevations, self.colors]
+        return sum(a.nbytes for a in arrays if a is not None)
+
+
+def pack_attributes(df, lon_col, lat_col, elevation_col=None, color_col=None, extra_cols=(),
+                    colors=None):
+    """把 DataFrame 的座標、高度、顏色打包成 typed array，只保留圖層需要的欄位。
+
+    顏色可以來自 color_col 欄位，或直接傳入 (n, 4) 的 RGBA 陣列 colors。
+    """
+    positions = np.empty((len(df), 2), dtype=np.float32)
+    positions[:, 0] = df[lon_col].to_numpy()
+    positions[:, 1] = df[lat_col].to_numpy()
+    elevations = None
+    if elevation_col is not None:
+        elevations = df[elevation_col].to_numpy(dtype=np.float32)
+    if color_col is not None:
+        colors = df[color_col].tolist()
+    if colors is not None:
+        colors = np.asarray(colors, dtype=np.uint8).reshape(-1, 4)
+    extras = {col: df[col].to_numpy() for col in extra_cols}
+    return PackedAttributes(len(df), positions, elevations, colors, extras)
+
+
+def compact_records(packed, precision=5):
+    """把打包好的屬性轉成短欄位名稱的 JSON 紀錄，並限制小數位數。
+
+    經緯度 5 位小數約為 1 公尺，已足夠繪圖；其他欄位保持原名 (給 tooltip 使用)。
+    """
+    columns = {POSITION_KEY: np.round(packed.positions.astype(np.float64), precision).tolist()}
+    if packed.elevations is not None:
+        columns[ELEVATION_KEY] = np.round(packed.elevations.astype(np.float64), 1).tolist()
+    if packed.colors is not None:
+        columns[COLOR_KEY] = packed.colors.tolist()
+    for name, values in packed.extras.items():
+        columns[name] = values.tolist()
+    keys = list(columns)
+    return [dict(zip(keys, row)) for row in zip(*columns.values())]
+
+
+def compact_layer(layer_type, packed, precision=5, elevation_accessor="get_elevation", **props):
+    """st.pydeck_chart 使用的圖層：只傳送需要的欄位，數值經過四捨五入。"""
+    props["get_position"] = POSITION_KEY
+    if packed.elevations is not None:
+        props[elevation_accessor] = ELEVATION_KEY
+    if packed.colors is not None:
+        props["get_fill_color"] = COLOR_KEY
+    return pdk.Layer(layer_type, compact_records(packed, precision), **props)
+
+
+class CompactDeck(pdk.Deck):
+    """與 pdk.Deck 相同，但 to_json 不縮排，減少 st.pydeck_chart 傳送的大小。"""
+
+    def to_json(self):
+        return json.dumps(self, sort_keys=True, default=default_serialize, separators=(",", ":"))
@@ -0,0 +1,141 @@
+import json
+from dataclasses import dataclass
+
+import numpy as np
+
+# 計算誤差時每次處理的列數，避免一次在記憶體中重建整張大網格
+ERROR_BLOCK_ROWS = 512
+
+
+@dataclass(frozen=True)
+class DecimatedSurface:
+    x: np.ndarray          # 保留下來的欄座標 (非等距)
+    y: np.ndarray          # 保留下來的列座標 (非等距)
+    z: np.ndarray          # 形狀 (len(y), len(x))
+    max_error: float       # 以雙線性內插還原後，與原始網格的最大絕對誤差
+    rms_error: float       # 均方根誤差
+    payload_bytes: int     # go.Surface 的 x / y / z 序列化成 JSON 的大小
+    original_samples: int
+
+    @property
+    def samples(self):
+        return self.z.size
+
+
+def _importance(z, axis):
+    """每一列 (axis=0) 或每一欄 (axis=1) 的曲率分數，山脊與山峰所在處最大。"""
+    z = np.nan_to_num(z, nan=np.nanmean(z)).astype(np.float32)
+    if axis == 1:
+        z = z.T
+    score = np.zeros(z.shape[0], dtype=np.float64)
+    if z.shape[0] > 2:
+        # 跨列方向的二階差分
+        score[1:-1] = np.abs(np.diff(z, n=2, axis=0)).max(axis=1)
+    if z.shape[1] > 2:
+        # 同一列內的二階差分
+        score = np.maximum(score, np.abs(np.diff(z, n=2, axis=1)).max(axis=1))
+    return score
+
+
+def _pick(score, count, must_keep):
+    """依「均勻 + 曲率」的累積重要度等分取樣，曲率大的地方取得較密。"""
+    n = len(score)
+    if count >= n:
+        return np.arange(n)
+    # 加上平均值讓平坦處仍有最低的取樣密度
+    density = score + max(score.mean(), 1e-12)
+    cumulative = np.concatenate([[0.0], np.cumsum(density)])
+    # 預留必須保留的位置 (兩端與 must_keep)，總數才不會超過 count
+    targets = np.linspace(0, cumulative[-1], max(2, count - len(must_keep) - 2))
+    picked = np.searchsorted(cumulative, targets, side="right") - 1
+    picked = np.clip(picked, 0, n - 1)
+    picked = np.unique(np.concatenate([picked, [0, n - 1], must_keep]))
+    if len(picked) < count:
+        # 曲率集中時多個目標會落在同一個位置；以分數最高、尚未選到的位置補滿 count
+        rest = np.setdiff1d(np.arange(n), picked, assume_unique=True)
+        extra = rest[np.argsort(-score[rest], kind="stable")[:count - len(picked)]]
+        picked = np.sort(np.concatenate([picked, extra]))
+    return picked
+
+
+def _interp_matrix(kept, n):
+    # 對 0..n-1 的每個位置，找出前後兩個保留點與內插權重
+    upper = np.clip(np.searchsorted(kept, np.arange(n)), 1, len(kept) - 1)
+    lower = upper - 1
+    span = (kept[upper] - kept[lower]).astype(np.float64)
+    weight = np.where(span > 0, (np.arange(n) - kept[lower]) / np.where(span > 0, span, 1), 0.0)
+    return lower, upper, weight
+
+
+def reconstruction_error(z, rows, cols):
+    """以雙線性內插從保留的列/欄還原整張網格，回傳 (最大誤差, RMS 誤差)。"""
+    z = np.asarray(z, dtype=np.float64)
+    kept = z[np.ix_(rows, cols)]
+    c_lo, c_hi, c_w = _interp_matrix(cols, z.shape[1])
+    r_lo, r_hi, r_w = _interp_matrix(rows, z.shape[0])
+    # 先沿欄方向內插成 (保留列數, 全部欄數)
+    along_cols = kept[:, c_lo] * (1 - c_w) + kept[:, c_hi] * c_w
+
+    max_error, squared, count = 0.0, 0.0, 0
+    for start in range(0, z.shape[0], ERROR_BLOCK_ROWS):
+        stop = min(start + ERROR_BLOCK_ROWS, z.shape[0])
+        w = r_w[start:stop, np.newaxis]
+        approx = along_cols[r_lo[start:stop]] * (1 - w) + along_cols[r_hi[start:stop]] * w
+        diff = np.abs(approx - z[start:stop])
+        valid = ~np.isnan(diff)
+        if valid.any():
+            max_error = max(max_error, float(diff[valid].max()))
+            squared += float((diff[valid] ** 2).sum())
+            count += int(valid.sum())
+    return max_error, (squared / count) ** 0.5 if count else 0.0
+
+
+def _payload_bytes(x, y, z):
+    return len(json.dumps({
+        "x": np.round(x, 6).tolist(),
+        "y": np.round(y, 6).tolist(),
+        "z": np.where(np.isnan(z), None, np.round(z, 3)).tolist(),
+    }))
+
+
+def decimate_surface(z, sample_budget, x=None, y=None, max_error=None):
+    """把網格簡化成不超過 sample_budget 個取樣點的非等距網格，保留山峰與山脊。
+
+    保留哪些列/欄依曲率決定 (曲率大處較密)，並一定保留最高點與最低點所在的
+    列與欄。若指定 max_error，會在預算內逐步增加取樣點，直到還原誤差不超過它。
+    結果可以直接給 go.Surface(x=..., y=..., z=...) 使用。
+    網格完全沒有有效的高程值 (例如整片都是 nodata) 時拋出 ValueError。
+    """
+    z = np.asarray(z, dtype=np.float64)
+    if z.ndim != 2 or not np.isfinite(z).any():
+        raise ValueError("網格中沒有任何有效的高程值")
+    n_rows, n_cols = z.shape
+    x = np.arange(n_cols) if x is None else np.asarray(x)
+    y = np.arange(n_rows) if y is None else np.asarray(y)
+
+    # 極值所在的列/欄一定保留
+    peak_row, peak_col = np.unravel_index(np.nanargmax(z), z.shape)
+    pit_row, pit_col = np.unravel_index(np.nanargmin(z), z.shape)
+    row_score, col_score = _importance(z, axis=0), _importance(z, axis=1)
+
+    def attempt(budget):
+        # 依長寬比分配列數與欄數
+        k_rows = max(2, min(n_rows, int(np.sqrt(budget * n_rows / n_cols))))
+        k_cols = max(2, min(n_cols, budget // k_rows))
+        rows = _pick(row_score, k_rows, [peak_row, pit_row])
+        cols = _pick(col_score, k_cols, [peak_col, pit_col])
+        return rows, cols, reconstruction_error(z, rows, cols)
+
+    budget = sample_budget if max_error is None else min(sample_budget, max(4, z.size // 64))
+    rows, cols, (err_max, err_rms) = attempt(budget)
+    while max_error is not None and err_max > max_error and budget < sample_budget:
+        budget = min(sample_budget, budget * 2)
+        rows, cols, (err_max, err_rms) = attempt(budget)
+
+    z_kept = z[np.ix_(rows, cols)]
+    return DecimatedSurface(
+        x=x[cols], y=y[rows], z=z_kept,
+        max_error=err_max, rms_error=err_rms,
+        payload_bytes=_payload_bytes(x[cols], y[rows], z_kept),
+        original_samples=z.size,
+    )
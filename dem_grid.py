@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+
+
+def _shape(resolution):
+    # resolution 可以是單一整數 (正方形網格) 或 (列數, 欄數)
+    if np.isscalar(resolution):
+        return int(resolution), int(resolution)
+    n_rows, n_cols = resolution
+    return int(n_rows), int(n_cols)
+
+
+def extent_around(center_lat, center_lon, half_span):
+    """以中心點和半寬 (度) 建立 (min_lon, min_lat, max_lon, max_lat) 範圍。"""
+    return (
+        center_lon - half_span,
+        center_lat - half_span,
+        center_lon + half_span,
+        center_lat + half_span,
+    )
+
+
+def gaussian_hill(resolution, peak=1000.0):
+    """模擬的 DEM：中央一座高斯山丘，回傳 (列數, 欄數) 的 2D 高程陣列。"""
+    n_rows, n_cols = _shape(resolution)
+    x = np.linspace(-1, 1, n_cols)
+    y = np.linspace(-1, 1, n_rows)
+    # 利用 broadcasting 直接算出 2D 陣列，不需要先建立兩份 meshgrid
+    return np.exp(-(x[np.newaxis, :] ** 2 + y[:, np.newaxis] ** 2) * 2) * peak
+
+
+# 每度緯度約 111,320 公尺
+METERS_PER_DEGREE = 111_320.0
+
+# 與 deck.gl GridLayer 預設 colorRange 相同的 6 階色彩
+DEFAULT_COLOR_RANGE = np.array([
+    [255, 255, 178], [254, 217, 118], [254, 178, 76],
+    [253, 141, 60], [240, 59, 32], [189, 0, 38],
+], dtype=np.uint8)
+
+
+def cell_steps(cell_size, extent):
+    """把以公尺為單位的格子大小換算成 (經度, 緯度) 的度數 (以範圍中心的緯度計算)。"""
+    min_lon, min_lat, max_lon, max_lat = extent
+    center_lat = np.radians((min_lat + max_lat) / 2)
+    lat_step = cell_size / METERS_PER_DEGREE
+    return lat_step / np.cos(center_lat), lat_step
+
+
+def aggregate_cells(lon, lat, elevation, cell_size, extent, statistic="mean"):
+    """在伺服器端把點雲分到 cell_size 公尺的格子裡，每個非空格子輸出一筆資料。
+
+    以 np.bincount 一次完成分箱，不需要逐點的 Python 迴圈。回傳的 lon / lat
+    是格子左下角 (deck.gl GridCellLayer 的定位方式)，elevation 為該格的
+    mean / max / sum，count 為該格的點數。範圍外的點會被忽略。
+    """
+    lon, lat, elevation = (np.asarray(a, dtype=np.float64) for a in (lon, lat, elevation))
+    min_lon, min_lat, max_lon, max_lat = extent
+    lon_step, lat_step = cell_steps(cell_size, extent)
+    n_cols = max(1, int(np.ceil((max_lon - min_lon) / lon_step)))
+    n_rows = max(1, int(np.ceil((max_lat - min_lat) / lat_step)))
+
+    col = np.floor((lon - min_lon) / lon_step).astype(np.int64)
+    row = np.floor((lat - min_lat) / lat_step).astype(np.int64)
+    # 剛好落在右/上邊界的點歸到最後一格
+    col[lon == max_lon] = n_cols - 1
+    row[lat == max_lat] = n_rows - 1
+    inside = (col >= 0) & (col < n_cols) & (row >= 0) & (row < n_rows) & ~np.isnan(elevation)
+    flat = row[inside] * n_cols + col[inside]
+    values = elevation[inside]
+
+    counts = np.bincount(flat, minlength=n_rows * n_cols)
+    if statistic == "max":
+        stat = np.full(n_rows * n_cols, -np.inf)
+        np.maximum.at(stat, flat, values)
+    else:
+        # 沒有任何點時 np.bincount 會回傳整數陣列，統一轉成 float64
+        stat = np.bincount(flat, weights=values, minlength=n_rows * n_cols).astype(np.float64)
+        if statistic == "mean":
+            stat = np.divide(stat, counts, out=np.zeros_like(stat), where=counts > 0)
+        elif statistic != "sum":
+            raise ValueError(f"不支援的統計方式: {statistic}")
+
+    cells = np.flatnonzero(counts)
+    return pd.DataFrame({
+        "lon": min_lon + (cells % n_cols) * lon_step,
+        "lat": min_lat + (cells // n_cols) * lat_step,
+        "elevation": stat[cells],
+        "count": counts[cells],
+    })
+
+
+def quantize_colors(values, color_range=DEFAULT_COLOR_RANGE, alpha=255):
+    """依數值大小把每一筆資料對應到 color_range 中的一個顏色 (RGBA)。"""
+    values = np.asarray(values, dtype=np.float64)
+    colors = np.empty((len(values), 4), dtype=np.uint8)
+    colors[:, 3] = alpha
+    if len(values) == 0:
+        return colors
+    low, high = values.min(), values.max()
+    scaled = (values - low) / (high - low) if high > low else np.zeros_like(values)
+    index = np.minimum((scaled * len(color_range)).astype(np.int64), len(color_range) - 1)
+    colors[:, :3] = color_range[index]
+    return colors
@@ -0,0 +1,147 @@
+import json
+import os
+import shutil
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from viewport import intersect_bounds
+
+# 金字塔檔案的存放位置：每個資料集一個資料夾，每一層一個 .npy
+PYRAMID_DIR = os.path.join(".cache", "pyramid")
+
+# 最粗的一層長邊至少保留幾個取樣點
+MIN_LEVEL_SIZE = 16
+
+
+def downsample(z, method="mean"):
+    """以 2x2 區塊做 mean / max pooling，長寬各縮小一半 (奇數時補 NaN)。"""
+    rows, cols = z.shape
+    pad_rows, pad_cols = rows % 2, cols % 2
+    if pad_rows or pad_cols:
+        z = np.pad(z, ((0, pad_rows), (0, pad_cols)), constant_values=np.nan)
+    blocks = z.reshape(z.shape[0] // 2, 2, z.shape[1] // 2, 2)
+    with warnings.catch_warnings():
+        # 整個區塊都是 NaN 時結果也是 NaN，不需要警告
+        warnings.simplefilter("ignore", RuntimeWarning)
+        pooled = np.nanmax(blocks, axis=(1, 3)) if method == "max" else np.nanmean(blocks, axis=(1, 3))
+    return pooled.astype(np.float32)
+
+
+class DemPyramid:
+    """多解析度 DEM 金字塔：第 0 層是原始網格，之後每層長寬各縮小一半。
+
+    每一層都存成 .npy，以 memory-map 開啟，所以只有實際用到的層 (以及
+    用到的列) 會從磁碟讀進記憶體。網格的第 0 列在南邊 (與 dem_grid 相同)，
+    extent 為 (min_lon, min_lat, max_lon, max_lat)，每個取樣點代表一個格子。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        self.extent = tuple(meta["extent"])
+        self.shapes = [tuple(shape) for shape in meta["shapes"]]
+        self.method = meta["method"]
+        self._levels = {}
+
+    @classmethod
+    def build(cls, path, z, extent, method="mean", min_size=MIN_LEVEL_SIZE):
+        os.makedirs(path, exist_ok=True)
+        level = np.ascontiguousarray(z, dtype=np.float32)
+        shapes = []
+        while True:
+            np.save(os.path.join(path, f"level_{len(shapes)}.npy"), level)
+            shapes.append(level.shape)
+            if max(level.shape) <= min_size:
+                break
+            level = downsample(level, method)
+        # meta.json 最後才寫，代表整個金字塔已經完成
+        with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"extent": list(extent), "shapes": shapes, "method": method}, f)
+        return cls(path)
+
+    @classmethod
+    def open_or_build(cls, key, build_source, extent, method="mean", pyramid_dir=PYRAMID_DIR):
+        """開啟 key 對應的金字塔；不存在時呼叫 build_source() 取得原始網格再建立。"""
+        path = os.path.join(pyramid_dir, key)
+        if not os.path.exists(os.path.join(path, "meta.json")):
+            # 先建在暫存資料夾再改名，其他 session 不會讀到建到一半的金字塔
+            tmp_path = f"{path}.tmp{os.getpid()}"
+            cls.build(tmp_path, build_source(), extent, method)
+            try:
+                os.rename(tmp_path, path)
+            except OSError:
+                shutil.rmtree(tmp_path, ignore_errors=True)  # 已經有人先建好了
+        return cls(path)
+
+    @property
+    def n_levels(self):
+        return len(self.shapes)
+
+    def level(self, i):
+        if i not in self._levels:
+            self._levels[i] = np.load(os.path.join(self.path, f"level_{i}.npy"), mmap_mode="r")
+        return self._levels[i]
+
+    def cell_size(self, i):
+        """第 i 層每個格子的 (經度, 緯度) 大小 (度)。"""
+        min_lon, min_lat, max_lon, max_lat = self.extent
+        rows, cols = self.shapes[0]
+        return (max_lon - min_lon) / cols * 2 ** i, (max_lat - min_lat) / rows * 2 ** i
+
+    def _window(self, i, bounds):
+        # bounds 在第 i 層所涵蓋的 (列起點, 列終點, 欄起點, 欄終點)
+        rows, cols = self.shapes[i]
+        lon_step, lat_step = self.cell_size(i)
+        min_lon, min_lat = self.extent[:2]
+        col0 = max(0, int(np.floor((bounds[0] - min_lon) / lon_step)))
+        col1 = min(cols, int(np.ceil((bounds[2] - min_lon) / lon_step)))
+        row0 = max(0, int(np.floor((bounds[1] - min_lat) / lat_step)))
+        row1 = min(rows, int(np.ceil((bounds[3] - min_lat) / lat_step)))
+        return row0, max(row0, row1), col0, max(col0, col1)
+
+    def choose_level(self, vertex_budget, bounds=None):
+        """挑選在 bounds 範圍內取樣點數不超過 vertex_budget 的最細一層。
+
+        bounds 通常是目前 ViewState 的可見範圍 (viewport.view_bounds)，
+        zoom 越小範圍越大，就會選到越粗的層。
+        """
+        bounds = self.extent if bounds is None else intersect_bounds(bounds, self.extent)
+        if bounds is None:
+            return self.n_levels - 1
+        for i in range(self.n_levels):
+            row0, row1, col0, col1 = self._window(i, bounds)
+            if (row1 - row0) * (col1 - col0) <= vertex_budget:
+                return i
+        return self.n_levels - 1
+
+    def read(self, i, bounds=None):
+        """讀取第 i 層在 bounds 範圍內的網格，回傳 (z, 實際範圍)。"""
+        bounds = self.extent if bounds is None else intersect_bounds(bounds, self.extent)
+        lon_step, lat_step = self.cell_size(i)
+        if bounds is None:
+            return np.empty((0, 0), dtype=np.float32), self.extent
+        row0, row1, col0, col1 = self._window(i, bounds)
+        min_lon, min_lat = self.extent[:2]
+        z = np.asarray(self.level(i)[row0:row1, col0:col1])
+        window_extent = (
+            min_lon + col0 * lon_step, min_lat + row0 * lat_step,
+            min_lon + col1 * lon_step, min_lat + row1 * lat_step,
+        )
+        return z, window_extent
+
+    def read_frame(self, i, bounds=None):
+        """read 的 DataFrame 版本：每個格子中心一筆 lon / lat / elevation。"""
+        z, (min_lon, min_lat, max_lon, max_lat) = self.read(i, bounds)
+        rows, cols = z.shape
+        lon_step, lat_step = self.cell_size(i)
+        lon = min_lon + (np.arange(cols) + 0.5) * lon_step
+        lat = min_lat + (np.arange(rows) + 0.5) * lat_step
+        frame = pd.DataFrame({
+            "lon": np.tile(lon, rows),
+            "lat": np.repeat(lat, cols),
+            "elevation": z.ravel(),
+        })
+        return frame.dropna(subset=["elevation"])
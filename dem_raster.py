@@ -0,0 +1,111 @@
+import os
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import rasterio
+import streamlit as st
+from rasterio.enums import Resampling
+from rasterio.warp import transform, transform_bounds
+from rasterio.windows import Window, from_bounds
+
+WGS84 = "EPSG:4326"
+
+
+@dataclass(frozen=True)
+class DemWindow:
+    z: np.ndarray          # 2D 高程 (float32，第 0 列在北邊，nodata 為 NaN)
+    bounds: tuple          # 實際讀取範圍 (left, bottom, right, top)，單位為 crs
+    crs: str
+    overview_factor: int   # 讀取的 overview 縮小倍率 (1 代表原始解析度)
+
+
+def target_shape(window_width, window_height, max_size):
+    """在保持長寬比的情況下，讓長邊不超過 max_size 個取樣點。"""
+    scale = min(1.0, max_size / max(window_width, window_height))
+    return max(1, round(window_height * scale)), max(1, round(window_width * scale))
+
+
+def choose_overview_level(factors, window_width, window_height, out_width, out_height):
+    """挑選最粗、但解析度仍不低於輸出大小的 overview。
+
+    factors 是 src.overviews(band) 的縮小倍率 (例如 [2, 4, 8])，
+    回傳 (level, factor)；level 為 None 代表直接讀原始解析度。
+    """
+    level, factor = None, 1
+    for i, f in enumerate(factors):
+        if window_width / f >= out_width and window_height / f >= out_height:
+            level, factor = i, f
+    return level, factor
+
+
+def read_dem_window(path, bounds=None, max_size=500, band=1):
+    """從 GeoTIFF 只讀取與 bounds 相交的範圍，並使用符合輸出解析度的 overview。
+
+    bounds 為 WGS84 經緯度 (min_lon, min_lat, max_lon, max_lat)，None 代表整張影像。
+    回傳的陣列長邊最多 max_size 個取樣點，因此大型 DEM 不會整張載入記憶體。
+    """
+    with rasterio.open(path) as src:
+        full = Window(0, 0, src.width, src.height)
+        if bounds is None:
+            window = full
+        else:
+            src_bounds = transform_bounds(WGS84, src.crs, *bounds) if src.crs else bounds
+            window = from_bounds(*src_bounds, transform=src.transform).intersection(full)
+        window = window.round_offsets().round_lengths()
+        out_height, out_width = target_shape(window.width, window.height, max_size)
+        level, factor = choose_overview_level(
+            src.overviews(band), window.width, window.height, out_width, out_height
+        )
+        window_bounds = src.window_bounds(window)
+        crs = src.crs.to_string() if src.crs else WGS84
+
+    # 用 overview_level 直接開啟該層 overview，並把視窗換算到該層的座標
+    open_kwargs = {} if level is None else {"overview_level": level}
+    with rasterio.open(path, **open_kwargs) as ovr:
+        ovr_window = from_bounds(*window_bounds, transform=ovr.transform)
+        ovr_window = ovr_window.intersection(Window(0, 0, ovr.width, ovr.height))
+        z = ovr.read(
+            band,
+            window=ovr_window,
+            out_shape=(out_height, out_width),
+            resampling=Resampling.average,
+            masked=True,
+        )
+    z = z.astype(np.float32).filled(np.nan)
+    return DemWindow(z=z, bounds=window_bounds, crs=crs, overview_factor=factor)
+
+
+def window_to_frame(dem):
+    """把 DemWindow 轉成 lon / lat / elevation 三欄的 DataFrame (給 Pydeck 使用)。"""
+    n_rows, n_cols = dem.z.shape
+    left, bottom, right, top = dem.bounds
+    # 取樣點放在每個像素的中心
+    xs = np.linspace(left, right, n_cols, endpoint=False) + (right - left) / n_cols / 2
+    ys = np.linspace(top, bottom, n_rows, endpoint=False) - (top - bottom) / n_rows / 2
+    lon = np.tile(xs, n_rows)
+    lat = np.repeat(ys, n_cols)
+    if dem.crs != WGS84:
+        lon, lat = (np.asarray(a) for a in transform(dem.crs, WGS84, lon, lat))
+    frame = pd.DataFrame({"lon": lon, "lat": lat, "elevation": dem.z.ravel()})
+    return frame.dropna(subset=["elevation"])
+
+
+def window_lonlat_bounds(dem):
+    """DemWindow 的範圍換算成 WGS84 的 (min_lon, min_lat, max_lon, max_lat)。"""
+    if dem.crs == WGS84:
+        return tuple(dem.bounds)
+    return tuple(transform_bounds(dem.crs, WGS84, *dem.bounds))
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def _load_dem_window(abs_path, mtime_ns, bounds, max_size):
+    return read_dem_window(abs_path, bounds, max_size)
+
+
+def load_dem_window(path, bounds=None, max_size=500):
+    """read_dem_window 的快取版本 (依檔案路徑、修改時間、範圍與輸出大小快取)。"""
+    return _load_dem_window(
+        os.path.abspath(path), os.stat(path).st_mtime_ns,
+        None if bounds is None else tuple(bounds), max_size,
+    )
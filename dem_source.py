@@ -0,0 +1,116 @@
+import os
+import threading
+import time
+import urllib.request
+from dataclasses import dataclass
+
+import pandas as pd
+
+from dataset_registry import shared_dataset
+
+# 下載過的 DEM 檔案存放位置
+DEM_CACHE_DIR = os.path.join(".cache", "dem")
+DOWNLOAD_TIMEOUT_SECONDS = 30
+
+# 下載失敗後等多久再重試 (秒)；每失敗一次加倍，最多 MAX_RETRY_BACKOFF_SECONDS
+RETRY_BACKOFF_SECONDS = 30
+MAX_RETRY_BACKOFF_SECONDS = 30 * 60
+
+
+@dataclass(frozen=True)
+class DemSource:
+    name: str           # 快取檔名 (不含副檔名)
+    url: str            # 遠端來源
+    bundled_path: str   # 隨專案一起上傳的備用檔案 (可以不存在)
+
+
+MT_BRUNO = DemSource(
+    name="mt_bruno_elevation",
+    url="https://raw.githubusercontent.com/plotly/datasets/master/api_docs/mt_bruno_elevation.csv",
+    bundled_path="mt_bruno_elevation.csv",
+)
+
+
+def cached_path(source):
+    return os.path.join(DEM_CACHE_DIR, source.name + ".csv")
+
+
+def local_path(source):
+    """依序尋找磁碟快取、隨專案附上的備用檔；都沒有時回傳 None。"""
+    for path in (cached_path(source), source.bundled_path):
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def download(source):
+    """把遠端 DEM 下載到磁碟快取 (先寫暫存檔，完成後才改名)。"""
+    path = cached_path(source)
+    os.makedirs(DEM_CACHE_DIR, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with urllib.request.urlopen(source.url, timeout=DOWNLOAD_TIMEOUT_SECONDS) as resp:
+        with open(tmp_path, "wb") as f:
+            f.write(resp.read())
+    os.replace(tmp_path, path)
+    return path
+
+
+@dataclass
+class _DownloadState:
+    thread: threading.Thread = None
+    failures: int = 0
+    retry_at: float = 0.0   # time.monotonic()；在這之前不重試
+
+
+# 每個來源在同一個 server 行程中同時最多只會有一個下載執行緒
+_downloads = {}
+_downloads_lock = threading.Lock()
+
+
+def fetch_in_background(source):
+    """在背景下載 source；上一次下載失敗時，等待退避時間過後才會再試一次。"""
+    with _downloads_lock:
+        state = _downloads.setdefault(source.name, _DownloadState())
+        idle = state.thread is None or not state.thread.is_alive()
+        if idle and time.monotonic() >= state.retry_at:
+            state.thread = threading.Thread(
+                target=_download_quietly, args=(source, state), daemon=True
+            )
+            state.thread.start()
+        return state.thread
+
+
+def _download_quietly(source, state):
+    try:
+        download(source)
+    except Exception:
+        # 例如暫時離線：依失敗次數加倍等待時間，之後的 rerun 會再觸發下載
+        with _downloads_lock:
+            state.failures += 1
+            backoff = RETRY_BACKOFF_SECONDS * 2 ** (state.failures - 1)
+            state.retry_at = time.monotonic() + min(backoff, MAX_RETRY_BACKOFF_SECONDS)
+    else:
+        with _downloads_lock:
+            state.failures = 0
+            state.retry_at = 0.0
+
+
+def _read_dem_array(path):
+    # 與原本 pd.read_csv(...).values 相同的解析方式
+    return pd.read_csv(path).to_numpy(dtype=float)
+
+
+def load_dem(source=MT_BRUNO):
+    """回傳 DEM 的 2D NumPy 陣列；本機還沒有檔案時回傳 None。
+
+    讀取順序：記憶體快取 → 磁碟快取 → 隨專案附上的備用檔。本機都沒有檔案時
+    會在背景執行緒下載到磁碟快取，這次 rerun 不會因網路而卡住。
+    """
+    path = local_path(source)
+    if path is None:
+        fetch_in_background(source)
+        return None
+    # 結果放在共用的唯讀資料集登錄表，所有 session 共用同一份陣列
+    return shared_dataset(
+        f"dem:{source.name}", (path, os.stat(path).st_mtime_ns), lambda: _read_dem_array(path)
+    )
@@ -0,0 +1,52 @@
+import threading
+from collections import OrderedDict
+
+
+class FigureCache:
+    """以記憶體預算 (位元組) 為上限的 LRU 圖表快取，可跨 session 共用。
+
+    每張圖的大小以序列化後的 JSON 長度估算；超過預算時從最久沒用到的開始淘汰。
+    快取中的 Figure 由所有 session 共用，取出後請勿修改。
+    """
+
+    def __init__(self, budget_bytes):
+        self.budget_bytes = budget_bytes
+        self._entries = OrderedDict()   # key -> (fig, size_bytes)
+        self._lock = threading.Lock()
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_build(self, key, build):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        # 在鎖外建立圖表，避免阻塞其他 session
+        fig = build()
+        size_bytes = len(fig.to_json())
+        with self._lock:
+            if key not in self._entries and size_bytes <= self.budget_bytes:
+                self._entries[key] = (fig, size_bytes)
+                self.used_bytes += size_bytes
+                while self.used_bytes > self.budget_bytes:
+                    _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                    self.used_bytes -= evicted_bytes
+                    self.evictions += 1
+        return fig
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "used_bytes": self.used_bytes,
+                "budget_bytes": self.budget_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
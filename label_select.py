@@ -0,0 +1,68 @@
+import threading
+
+import numpy as np
+import streamlit as st
+
+from viewport import world_pixels
+
+# 與 TextLayer 的 get_size 相同 (像素)；用來估計每個標籤在畫面上佔的大小
+LABEL_FONT_SIZE = 14
+
+
+class LabelSelector:
+    """依優先度 (例如遊客人數) 挑選彼此不重疊的標籤，每個 zoom 層級算一次。
+
+    每個標籤視為以點為中心、cell_width x cell_height 像素的方框。每個層級把畫面
+    切成與方框大小相同的格子 (螢幕座標)，依優先度由高到低逐一檢查：只有周圍
+    3x3 個格子裡已保留的標籤都不與它重疊時才保留。相距超過一格的標籤不可能
+    重疊，所以每個標籤只需要比對最多 9 個標籤；結果依整數 zoom 快取，之後只是查表。
+    """
+
+    def __init__(self, lon, lat, priority, texts, font_size=LABEL_FONT_SIZE):
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.lat = np.asarray(lat, dtype=np.float64)
+        # 優先度高的排在前面；缺值當成最低
+        priority = np.nan_to_num(np.asarray(priority, dtype=np.float64), nan=-np.inf)
+        self.rank = np.argsort(-priority, kind="stable")
+        # 格子寬度取 90% 標籤都放得下的長度 (CJK 字寬約等於字體大小)
+        lengths = np.array([len(str(t)) for t in texts]) if len(texts) else np.array([1])
+        self.cell_width = max(1.0, np.percentile(lengths, 90)) * font_size
+        self.cell_height = font_size * 1.5
+        self._levels = {}
+        self._lock = threading.Lock()
+
+    def select(self, zoom, within=None):
+        """回傳在 zoom 層級下保留的標籤位置 (遞增排序)；within 可限制在可見的點之中。"""
+        level = int(np.floor(zoom))
+        with self._lock:
+            if level not in self._levels:
+                self._levels[level] = self._compute(level)
+            kept = self._levels[level]
+        if within is not None:
+            kept = np.intersect1d(kept, within, assume_unique=True)
+        return kept
+
+    def _overlaps(self, x0, y0, x1, y1):
+        # 兩個以 (x, y) 為中心、大小相同的標籤方框是否相交
+        return abs(x0 - x1) < self.cell_width and abs(y0 - y1) < self.cell_height
+
+    def _compute(self, level):
+        x, y = world_pixels(self.lon[self.rank], self.lat[self.rank], level)
+        cols = np.floor(x / self.cell_width).astype(np.int64).tolist()
+        rows = np.floor(y / self.cell_height).astype(np.int64).tolist()
+        x, y = x.tolist(), y.tolist()
+        # 格子 -> 已保留標籤的中心；同一格的兩個標籤一定重疊，所以每格最多一個
+        occupied = {}
+        kept = []
+        for i, (col, row) in enumerate(zip(cols, rows)):
+            neighbours = (occupied.get((col + dc, row + dr)) for dc in (-1, 0, 1) for dr in (-1, 0, 1))
+            if not any(other is not None and self._overlaps(x[i], y[i], *other) for other in neighbours):
+                occupied[col, row] = (x[i], y[i])
+                kept.append(i)
+        return np.sort(self.rank[np.array(kept, dtype=np.int64)])
+
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def label_selector(dataset_key, _lon, _lat, _priority, _texts):
+    # 每個資料版本只建立一次，所有 session 共用
+    return LabelSelector(_lon, _lat, _priority, _texts)
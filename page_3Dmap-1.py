@@ -1,8 +1,20 @@
+import os
+from functools import partial
+
 import streamlit as st
-import pandas as pd
-import numpy as np
 import pydeck as pdk
-# 注意：這個版本不再需要 numpy
+from data_table import paged_table
+from dataset_extent import dataset_extent, extent_of_bounds
+from deck_layers import CompactDeck, compact_layer, pack_attributes
+from dem_grid import aggregate_cells, extent_around, gaussian_hill, quantize_colors
+from dem_pyramid import DemPyramid
+from label_select import LABEL_FONT_SIZE, label_selector
+from perf import span
+from poi_clusters import cluster_pyramid
+from spatial_index import grid_index
+from tourist_data import MissingColumnsError, load_tourist_table
+from viewport import expand_bounds, view_bounds
+# 注意：這個頁面本身不直接使用 numpy / pandas，資料處理都在上面匯入的模組裡
 
 st.title("高雄市主要觀光遊憩區遊客人次 3D 柱狀圖👤")
 
@@ -34,34 +46,19 @@ if "MAPBOX_API_KEY" not in st.secrets:
     st.stop()
 
 # --- 2. (關鍵) 讀取並「轉置」您的 CSV 檔案 ---
+# 讀檔、轉置、型別轉換與座標範圍檢查都在 spatial_table.load_spatial_table 裡完成
+# (「屬性為列、景點為欄」或一般的表格皆可)，結果依 (檔案路徑, 修改時間, 檔案大小)
+# 快取，rerun 時不會再讀磁碟
 try:
-    # 讀取 CSV，並將第一欄 (景點名稱, lat, lon...) 作為索引 (index)
-    data_raw = pd.read_csv(YOUR_CSV_FILE, index_col=0)
-    
-    # 執行「轉置」(Transpose)，讓 (壽山動物園, 旗津...) 變成「列」
-    data = data_raw.T 
-    
-    # 將索引 (景點名稱) 變回一個普通的欄位
-    data = data.reset_index()
-    data = data.rename(columns={'index': '景點名稱'})
-    
-    # 檢查您在上方設定的欄位是否存在
-    required_cols = {LAT_ROW_NAME, LON_ROW_NAME, WEIGHT_ROW_NAME, '景點名稱'}
-    if not required_cols.issubset(data.columns):
-        st.error(f"錯誤：您在程式碼中設定的「橫列標題」在 CSV 檔案中找不到。")
-        st.error(f"您設定的欄位: {required_cols}")
-        st.error(f"CSV 轉置後的實際欄位: {data.columns.tolist()}")
-        st.error(f"請檢查程式碼第 10-19 行的設定，特別是 `WEIGHT_ROW_NAME`。")
-        st.stop()
-        
-    # 轉換資料型別，以防萬一
-    data[LAT_ROW_NAME] = pd.to_numeric(data[LAT_ROW_NAME], errors='coerce')
-    data[LON_ROW_NAME] = pd.to_numeric(data[LON_ROW_NAME], errors='coerce')
-    data[WEIGHT_ROW_NAME] = pd.to_numeric(data[WEIGHT_ROW_NAME], errors='coerce')
-    
-    # 移除任何缺少座標或遊客人數的資料
-    data = data.dropna(subset=[LAT_ROW_NAME, LON_ROW_NAME, WEIGHT_ROW_NAME])
-    
+    tourist_table, load_timing = load_tourist_table(
+        YOUR_CSV_FILE, LAT_ROW_NAME, LON_ROW_NAME, WEIGHT_ROW_NAME
+    )
+except MissingColumnsError as e:
+    st.error(f"錯誤：您在程式碼中設定的「橫列標題」在 CSV 檔案中找不到。")
+    st.error(f"您設定的欄位: {e.required}")
+    st.error(f"CSV 中的實際欄位: {e.actual}")
+    st.error(f"請檢查程式碼第 10-19 行的設定，特別是 `WEIGHT_ROW_NAME`。")
+    st.stop()
 except FileNotFoundError:
     st.error(f"錯誤：找不到檔案 '{YOUR_CSV_FILE}'。")
     st.error("請確保您的 CSV 檔案已上傳到 Streamlit (與 app.py 放在一起)。")
@@ -70,59 +67,149 @@ except Exception as e:
     st.error(f"讀取或轉置 CSV 時出錯: {e}")
     st.stop()
 
-# --- 3. 定義 Pydeck 圖層 ---
+data = tourist_table.frame
+if tourist_table.report.dropped:
+    reasons = "、".join(f"{reason} ({n} 筆)" for reason, n in tourist_table.report.dropped.items())
+    st.warning(f"已略過 {tourist_table.report.rows_in - len(data)} 個景點：{reasons}")
 
-# 圖層 A: 3D 柱狀圖 (ColumnLayer)
-column_layer = pdk.Layer(
-    'ColumnLayer',
-    data=data,
-    get_position=[LON_ROW_NAME, LAT_ROW_NAME],  # [經度, 緯度]
-    get_elevation=WEIGHT_ROW_NAME,             # 高度 = 遊客人數
-    elevation_scale=0.01, # 將遊客人數縮小，避免柱子太高
-    radius=500,                                # 每個柱子的半徑 (500 公尺)
-    get_fill_color=[0, 128, 255, 180],         # 柱子顏色 (橘色)
-    pickable=True,
-    extruded=True,
+st.caption(
+    f"資料載入：{'快取命中' if load_timing.cache_hit else '從磁碟讀取'}"
+    f"，本次 {load_timing.call_seconds * 1000:.2f} ms"
+    f"（冷載入 {load_timing.cold_seconds * 1000:.2f} ms）"
 )
 
-# 圖層 B: 景點名稱 (TextLayer)
-text_layer = pdk.Layer(
-    'TextLayer',
-    data=data,
-    get_position=[LON_ROW_NAME, LAT_ROW_NAME],
-    get_text='景點名稱',
-    get_color=[0, 0, 0, 200], # 文字顏色 (黑色)
-    get_size=14,              # 文字大小
-    get_alignment_baseline="'bottom'", # 文字顯示在座標「上方」
-    get_pixel_offset=[0, -10] # 向上偏移 10 像素
+if data.empty:
+    # 所有景點都因缺值或座標錯誤被略過，沒有範圍可以取景
+    st.warning("沒有任何可以繪製的景點，請檢查 CSV 的座標與遊客人數欄位。")
+    st.stop()
+
+# --- 3. 定義 Pydeck 圖層 ---
+
+# 只把目前視角 (加上 VIEW_MARGIN 的邊界) 看得到的景點送到瀏覽器：
+# 網格索引每個資料版本只建立一次，之後每次 rerun 只是一次範圍查詢。
+# Streamlit 拿不到瀏覽器端拖曳後的視角，所以以下方的縮放等級與中心估計範圍；
+# 拖曳超出邊界的區域要調整縮放等級 (rerun) 後才會出現
+VIEW_MARGIN = 0.5
+
+# 視角中心與預設縮放等級每個資料版本只算一次：中心取經緯度的中位數，
+# 縮放等級剛好框住去掉兩端 1% 離群點後的範圍 (見 dataset_extent)
+tourist_extent = dataset_extent(tourist_table.version, data[LON_ROW_NAME], data[LAT_ROW_NAME])
+view_center = tourist_extent.center   # (緯度中位數, 經度中位數)
+view_zoom = st.slider(
+    "地圖縮放等級", min_value=5.0, max_value=16.0, step=0.5,
+    value=min(16.0, max(5.0, round(tourist_extent.zoom * 2) / 2)),
 )
+visible_bounds = expand_bounds(view_bounds(*view_center, view_zoom), VIEW_MARGIN)
+
+# 顯示方式：景點很多時改用網格聚合，每個格子一根柱子 (高度 = 格子內遊客人數總和)
+DISPLAY_MODES = ["每個景點一根柱子", "網格聚合 (適合大量景點)"]
+display_mode = st.radio("顯示方式", DISPLAY_MODES, horizontal=True)
+
+if display_mode == DISPLAY_MODES[0]:
+    with span("tourist.cull", rows=len(data)):
+        poi_index = grid_index(tourist_table.version, data[LON_ROW_NAME], data[LAT_ROW_NAME])
+        visible_positions = poi_index.query(visible_bounds)
+        visible = data.iloc[visible_positions]
+
+    # 景點名稱只送出彼此不重疊的標籤：依遊客人數由高到低，與已保留的標籤重疊
+    # 就略過 (每個 zoom 層級只計算一次)，避免大量 CJK 文字拖慢瀏覽器
+    with span("tourist.labels"):
+        labels = label_selector(
+            tourist_table.version, data[LON_ROW_NAME], data[LAT_ROW_NAME],
+            data[WEIGHT_ROW_NAME], data['景點名稱'],
+        )
+        labeled = data.iloc[labels.select(view_zoom, within=visible_positions)]
+    st.caption(f"畫面範圍內的景點：{len(visible)} / {len(data)}，顯示 {len(labeled)} 個名稱標籤")
+
+    # pdk.Layer 會在建立時把資料轉成 JSON 紀錄，所以一併計時；
+    # 座標與高度先打包成 typed array，只把圖層需要的欄位 (四捨五入後) 送到瀏覽器
+    with span("tourist.build_layers", rows=len(visible)):
+        # 圖層 A: 3D 柱狀圖 (ColumnLayer)
+        column_layer = compact_layer(
+            'ColumnLayer',
+            pack_attributes(
+                visible, LON_ROW_NAME, LAT_ROW_NAME, WEIGHT_ROW_NAME,   # [經度, 緯度], 高度 = 遊客人數
+                extra_cols=['景點名稱', WEIGHT_ROW_NAME],           # tooltip 需要的欄位
+            ),
+            elevation_scale=0.01, # 將遊客人數縮小，避免柱子太高
+            radius=500,                                # 每個柱子的半徑 (500 公尺)
+            get_fill_color=[0, 128, 255, 180],         # 柱子顏色 (橘色)
+            pickable=True,
+            extruded=True,
+        )
+
+        # 圖層 B: 景點名稱 (TextLayer)
+        text_layer = compact_layer(
+            'TextLayer',
+            pack_attributes(labeled, LON_ROW_NAME, LAT_ROW_NAME, extra_cols=['景點名稱']),
+            get_text='景點名稱',
+            get_color=[0, 0, 0, 200], # 文字顏色 (黑色)
+            get_size=LABEL_FONT_SIZE, # 文字大小
+            get_alignment_baseline="'bottom'", # 文字顯示在座標「上方」
+            get_pixel_offset=[0, -10] # 向上偏移 10 像素
+        )
+    tourist_layers = [column_layer, text_layer]  # 同時顯示兩個圖層
+
+    # Tooltip (滑鼠移上去時顯示的資訊) - 簡化版語法
+    tooltip = {
+        "html": "<b>{景點名稱}</b><br/>" + WEIGHT_ROW_NAME + ": {" + WEIGHT_ROW_NAME + "}"
+    }
+
+else:
+    # 多層網格在伺服器端算好 (每個資料版本一次)；改變縮放等級只是挑一層、篩選範圍內的格子
+    with span("tourist.clusters", rows=len(data)):
+        clusters = cluster_pyramid(
+            tourist_table.version, data[LON_ROW_NAME], data[LAT_ROW_NAME], data[WEIGHT_ROW_NAME]
+        )
+        cluster_level = clusters.level_for_zoom(view_zoom, view_center[0])
+        cells = clusters.cells(cluster_level, visible_bounds)
+    st.caption(
+        f"網格大小 {clusters.cell_size(cluster_level):,} 公尺，"
+        f"{len(data)} 個景點聚合成 {len(cells)} 個格子"
+    )
+
+    with span("tourist.build_layers", rows=len(cells)):
+        cluster_layer = compact_layer(
+            'GridCellLayer',
+            pack_attributes(
+                cells, 'lon', 'lat', 'elevation',   # lon / lat 為格子左下角
+                extra_cols=['count', 'weight'],
+                colors=quantize_colors(cells['weight']),
+            ),
+            cell_size=clusters.cell_size(cluster_level),
+            extruded=True,
+            pickable=True,
+        )
+    tourist_layers = [cluster_layer]
+    tooltip = {"html": "景點數: {count}<br/>" + WEIGHT_ROW_NAME + " 合計: {weight}"}
 
 # --- 4. 設定地圖視角和 Tooltip ---
 view_state = pdk.ViewState(
-    latitude=data[LAT_ROW_NAME].mean(),   # 視角中心 (平均緯度)
-    longitude=data[LON_ROW_NAME].mean(), # 視角中心 (平均經度)
-    zoom=9.5,                             # 縮放等級
+    latitude=view_center[0],   # 視角中心 (緯度中位數)
+    longitude=view_center[1],  # 視角中心 (經度中位數)
+    zoom=view_zoom,            # 縮放等級
     pitch=50,                             # 傾斜 50 度
 )
 
-# Tooltip (滑鼠移上去時顯示的資訊) - 簡化版語法
-tooltip = {
-    "html": "<b>{景點名稱}</b><br/>" + WEIGHT_ROW_NAME + ": {" + WEIGHT_ROW_NAME + "}"
-}
-
 # --- 5. 組合圖層並顯示地圖 ---
-r = pdk.Deck(
-    layers=[column_layer, text_layer], # 同時顯示兩個圖層
+r = CompactDeck(
+    layers=tourist_layers,
     initial_view_state=view_state,
     tooltip=tooltip,
 )
 
-st.pydeck_chart(r)
+with span("tourist.pydeck_chart"):
+    st.pydeck_chart(r)
 
 # --- 6. (可選) 顯示處理過的資料表 ---
 st.write("---")
 st.subheader("地圖資料來源（已轉置）")
-st.dataframe(data[['景點名稱', LAT_ROW_NAME, LON_ROW_NAME, WEIGHT_ROW_NAME]])
+# 分頁表格：排序與篩選在伺服器端完成，瀏覽器一次只收到一頁
+with span("tourist.dataframe"):
+    paged_table(
+        data, "tourist_table", tourist_table.version,
+        columns=['景點名稱', LAT_ROW_NAME, LON_ROW_NAME, WEIGHT_ROW_NAME],
+    )
 
 # ===============================================
 #          第二個地圖：模擬 DEM
@@ -131,42 +218,157 @@ st.dataframe(data[['景點名稱', LAT_ROW_NAME, LON_ROW_NAME, WEIGHT_ROW_NAME]]
 st.title("Pydeck 3D 地圖 (網格 - DEM 模擬)")
 
 # --- 1. 模擬 DEM 網格資料 ---
-x, y = np.meshgrid(np.linspace(-1, 1, 50), np.linspace(-1, 1, 50))
-z = np.exp(-(x**2 + y**2) * 2) * 1000
-
-data_dem_list = [] # 修正: 建立一個列表來收集字典
-base_lat, base_lon = 25.0, 121.5
-for i in range(50):
-    for j in range(50):
-        data_dem_list.append({ # 修正: 將字典附加到列表中
-            "lon": base_lon + x[i, j] * 0.1,
-            "lat": base_lat + y[i, j] * 0.1,
-            "elevation": z[i, j]
-        })
-df_dem = pd.DataFrame(data_dem_list) # 從列表創建 DataFrame
-
-# --- 2. 設定 Pydeck 圖層 (GridLayer) ---
-layer_grid = pdk.Layer( # 稍微改個名字避免混淆
-    'GridLayer',
-    data=df_dem,
-    get_position='[lon, lat]',
-    get_elevation_weight='elevation', # 使用 'elevation' 欄位當作高度
-    elevation_scale=1,
-    cell_size=2000,
-    extruded=True,
-    pickable=True # 加上 pickable 才能顯示 tooltip
+# DEM_RESOLUTION 可調整網格解析度 (例如 1000 代表 1000x1000)，
+# 網格由 dem_grid 以 NumPy 陣列直接產生，不再逐格建立字典
+DEM_RESOLUTION = 50
+base_lat, base_lon = 25.0, 121.5   # 模擬 DEM 的中心位置
+
+# 若要瀏覽真實 DEM，將 DEM_GEOTIFF_FILE 設為 GeoTIFF 檔案路徑 (None 則使用模擬資料)；
+# 只會讀取與下方範圍相交的區塊，並自動選用符合 DEM_RESOLUTION 的 overview
+DEM_GEOTIFF_FILE = None
+
+# 網格大小 (公尺)；每個格子的平均海拔在伺服器端算好，瀏覽器只會收到非空的格子
+DEM_CELL_SIZE = 2000
+dem_extent = extent_around(base_lat, base_lon, 0.1)
+
+# 模擬網格會先建成多解析度金字塔 (.cache/pyramid/，每層長寬各縮小一半)，
+# 再依下方縮放等級的可見範圍，挑選取樣點數不超過 DEM_VERTEX_BUDGET 的最細一層
+DEM_VERTEX_BUDGET = 250_000
+
+
+# 圖磚模式：設定 DEM_GEOTIFF_FILE 後可改用 localtileserver 提供 XYZ 圖磚，
+# 瀏覽器只請求畫面內的圖磚 (TerrainLayer)，不需要把整份網格送到前端；
+# 產生過的圖磚存在 .cache/tiles/ (磁碟 LRU，上限見 tile_server.TILE_CACHE_MAX_BYTES)
+DEM_TILE_MODE = bool(DEM_GEOTIFF_FILE) and st.toggle("以圖磚瀏覽 GeoTIFF (TerrainLayer)", value=True)
+
+
+@st.cache_resource(show_spinner=False)
+def tile_server_pool():
+    # 所有 session 共用：每個 GeoTIFF 一個伺服器，檔案修改時自動換新；圖磚快取只有一份
+    from tile_server import TileServerPool
+    return TileServerPool()
+
+
+if DEM_TILE_MODE:
+    try:
+        with span("dem.tile_server"):
+            tile_server = tile_server_pool().get(DEM_GEOTIFF_FILE)
+    except Exception as e:
+        st.error(f"啟動圖磚伺服器 '{DEM_GEOTIFF_FILE}' 時出錯: {e}")
+        st.stop()
+
+    min_lon, min_lat, max_lon, max_lat = tile_server.bounds()
+    terrain_extent = extent_of_bounds((min_lon, min_lat, max_lon, max_lat))
+    layer_terrain = pdk.Layer(
+        "TerrainLayer",
+        elevation_data=tile_server.url_template("elevation"),
+        texture=tile_server.url_template("texture"),
+        elevation_decoder=tile_server.elevation_decoder(),
+        bounds=[min_lon, min_lat, max_lon, max_lat],
+        min_zoom=tile_server.client.min_zoom,
+        max_zoom=tile_server.client.max_zoom,
+    )
+    view_state_terrain = pdk.ViewState(
+        latitude=terrain_extent.center[0], longitude=terrain_extent.center[1],
+        zoom=terrain_extent.zoom, pitch=50
+    )
+    st.pydeck_chart(CompactDeck(layers=[layer_terrain], initial_view_state=view_state_terrain))
+    st.caption(
+        f"圖磚快取: {tile_server.cache.stats()['tiles']} 張, "
+        f"{tile_server.cache.stats()['used_bytes'] / 1e6:.1f} MB"
+    )
+    # 圖磚模式到此結束，以下的網格 (GridCellLayer) 不需要再建立
+    st.stop()
+
+
+@st.cache_resource(show_spinner=False)
+def load_synthetic_pyramid(resolution, extent):
+    key = f"synthetic_{resolution}_" + "_".join(f"{v:.5f}" for v in extent)
+    return DemPyramid.open_or_build(key, lambda: gaussian_hill(resolution), extent)
+
+
+if DEM_GEOTIFF_FILE:
+    from dem_raster import load_dem_window, window_lonlat_bounds, window_to_frame
+
+    try:
+        with span("dem.load_geotiff"):
+            dem_window = load_dem_window(DEM_GEOTIFF_FILE, dem_extent, DEM_RESOLUTION)
+    except Exception as e:
+        st.error(f"讀取 DEM 檔案 '{DEM_GEOTIFF_FILE}' 時出錯: {e}")
+        st.stop()
+    # dem_window.bounds 為檔案本身的座標系，取景改用換算後的經緯度範圍
+    dem_view = extent_of_bounds(window_lonlat_bounds(dem_window))
+else:
+    # GeoTIFF 本身已有 overview；模擬網格則使用金字塔，只會讀取需要的那一層
+    with span("dem.pyramid", resolution=DEM_RESOLUTION):
+        dem_pyramid = load_synthetic_pyramid(DEM_RESOLUTION, dem_extent)
+    dem_view = extent_of_bounds(dem_extent)
+
+# 中心由 DEM 的實際範圍算出；縮放等級預設剛好框住整個範圍
+dem_zoom = st.slider(
+    "DEM 地圖縮放等級", min_value=5.0, max_value=16.0, step=0.5,
+    value=min(16.0, max(5.0, round(dem_view.zoom * 2) / 2)),
 )
 
-# --- 3. 設定視角 (View) ---
+if DEM_GEOTIFF_FILE:
+    # 加上修改時間：檔案被取代後，格子的快取也會跟著失效
+    dem_dataset_key = (
+        DEM_GEOTIFF_FILE, os.stat(DEM_GEOTIFF_FILE).st_mtime_ns, dem_window.bounds, DEM_RESOLUTION
+    )
+    read_dem_frame = partial(window_to_frame, dem_window)
+else:
+    # zoom 越小可見範圍越大，就會選到越粗的層
+    dem_visible_bounds = view_bounds(*dem_view.center, dem_zoom)
+    dem_level = dem_pyramid.choose_level(DEM_VERTEX_BUDGET, dem_visible_bounds)
+    dem_dataset_key = ("synthetic", DEM_RESOLUTION, dem_level, dem_visible_bounds)
+    read_dem_frame = partial(dem_pyramid.read_frame, dem_level, dem_visible_bounds)
+
+
+# --- 2. 在伺服器端把網格點分到格子裡 ---
+# 依 (資料集, 格子大小, 範圍) 快取；_read_frame 以底線開頭，Streamlit 不會對它計算雜湊。
+# 網格點的 DataFrame 只在快取沒命中時才建立，一般的 rerun 不會碰到整份網格
+@st.cache_data(max_entries=16, show_spinner=False)
+def aggregate_dem_cells(dataset_key, _read_frame, cell_size, extent):
+    df_dem = _read_frame()
+    return aggregate_cells(
+        df_dem['lon'], df_dem['lat'], df_dem['elevation'], cell_size, extent
+    )
+
+
+with span("dem.aggregate"):
+    df_cells = aggregate_dem_cells(dem_dataset_key, read_dem_frame, DEM_CELL_SIZE, dem_extent)
+
+if df_cells.empty:
+    # 例如 GeoTIFF 的讀取範圍整片都是 nodata
+    st.warning("DEM 的範圍內沒有任何有效的高程值，請調整 base_lat / base_lon 或換一個檔案。")
+    st.stop()
+
+# --- 3. 設定 Pydeck 圖層 (GridCellLayer，每個格子一根柱子) ---
+with span("dem.build_layer", rows=len(df_cells)):
+    layer_grid = compact_layer( # 稍微改個名字避免混淆
+        'GridCellLayer',
+        pack_attributes(
+            df_cells, 'lon', 'lat', 'elevation',   # lon / lat 為格子左下角
+            colors=quantize_colors(df_cells['elevation']),
+        ),
+        elevation_scale=1,
+        cell_size=DEM_CELL_SIZE,
+        extruded=True,
+        pickable=True # 加上 pickable 才能顯示 tooltip
+    )
+
+# --- 4. 設定視角 (View) ---
+# 中心由 DEM 的實際範圍算出 (讀取的視窗或模擬網格的範圍)，縮放等級來自上方的滑桿
 view_state_grid = pdk.ViewState( # 稍微改個名字避免混淆
-    latitude=base_lat, longitude=base_lon, zoom=10, pitch=50
+    latitude=dem_view.center[0], longitude=dem_view.center[1], zoom=dem_zoom, pitch=50
 )
 
-# --- 4. 組合並顯示 (第二個地圖) ---
-r_grid = pdk.Deck( # 稍微改個名字避免混淆
+# --- 5. 組合並顯示 (第二個地圖) ---
+r_grid = CompactDeck( # 稍微改個名字避免混淆
     layers=[layer_grid],
     initial_view_state=view_state_grid,
     # mapbox_key=MAPBOX_KEY, # <--【修正點】移除這裡的 mapbox_key
-    tooltip={"text": "海拔高度: {elevationValue} 公尺"} # GridLayer 用 elevationValue
+    tooltip={"text": "海拔高度: {e} 公尺"} # e 為伺服器端算好的格子平均海拔
 )
-st.pydeck_chart(r_grid)
\ No newline at end of file
+with span("dem.pydeck_chart"):
+    st.pydeck_chart(r_grid)
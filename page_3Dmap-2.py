@@ -1,7 +1,18 @@
+import os
+
+import numpy as np
 import streamlit as st
-import plotly.express as px
 import plotly.graph_objects as go
-import pandas as pd
+from data_table import paged_table
+from dem_grid import gaussian_hill
+from dem_decimate import decimate_surface
+from dem_pyramid import DemPyramid
+from dem_source import MT_BRUNO, load_dem, local_path
+from perf import span
+from poverty_data import DATA_COLUMN, load_and_clean_data
+from poverty_figures import (
+    cached_animation_figure, cached_year_figure, year_figure_cache,
+)
 
 
 st.title("Plotly 3D 地球儀：全球極端貧窮人口比例")
@@ -9,45 +20,15 @@ st.title("Plotly 3D 地球儀：全球極端貧窮人口比例")
 # --- 1. 定義我們要使用的「原始」檔案和欄位 ---
 # (這必須是您在 GitHub 上傳的原始檔案名稱)
 ORIGINAL_CSV_FILE = "share-of-population-in-extreme-poverty.csv"
-DATA_COLUMN = "Share of population in poverty ($3 a day, 2021 prices)"
+# 頁面實際用到的欄位 (只從 Parquet 副本讀取這些欄位)
+COLUMNS = ["Entity", "Code", "Year", DATA_COLUMN]
 
 # --- 2. 讀取「原始」 CSV 檔案 ---
-@st.cache_data  # (重要) 使用快取，避免每次選擇都重新讀檔
-def load_and_clean_data(file_path):
-    try:
-        df_raw = pd.read_csv(file_path)
-    except FileNotFoundError:
-        st.error(f"錯誤：找不到您的原始檔案 '{file_path}'。")
-        st.error("請確保您已將原始的 ZIP 檔案內容上傳到 GitHub (與 app.py 放在一起)。")
-        return None, None
-    except Exception as e:
-        st.error(f"讀取原始檔案時出錯: {e}")
-        return None, None
-
-    # --- (關鍵) 即時清理資料 ---
-    try:
-        df_clean = df_raw.copy()
-        # 轉換 'Year' 欄位為數字
-        df_clean['Year'] = pd.to_numeric(df_clean['Year'], errors='coerce')
-        df_clean = df_clean.dropna(subset=['Year'])
-        df_clean['Year'] = df_clean['Year'].astype(int)
-
-        # 篩選掉「地區」資料 (只保留有 3 位 ISO 代碼的「國家」)
-        df_clean = df_clean.dropna(subset=['Code'])
-        df_countries = df_clean[df_clean['Code'].str.len() == 3].copy()
-        
-        # 找出所有可用的年份 (只找有實際貧窮數據的年份)
-        df_with_data = df_countries.dropna(subset=[DATA_COLUMN])
-        available_years = sorted(df_with_data['Year'].unique(), reverse=True)
-        
-        return df_countries, available_years
-
-    except Exception as e:
-        st.error(f"清理資料時發生錯誤: {e}")
-        return None, None
-
-# 執行讀取和清理
-df_countries, available_years = load_and_clean_data(ORIGINAL_CSV_FILE)
+# 讀取與清理在 poverty_data.load_and_clean_data (已快取)：第一次會把 CSV
+# 清理成 Parquet 副本 (.cache/)，之後的啟動只讀副本；
+# 同時建立「年份 → 可繪製資料」的索引，切換年份時不必再掃描整個表
+with span("poverty.load"):
+    df_countries, available_years, year_index = load_and_clean_data(ORIGINAL_CSV_FILE, COLUMNS)
 
 # 如果讀取失敗，就停止
 if df_countries is None or not available_years:
@@ -56,63 +37,176 @@ if df_countries is None or not available_years:
 
 
 # --- 3. (新功能) 建立年份選擇「Bar」 ---
-st.header("請選擇您想查看的年份")
+# 動畫模式：所有年份放在同一張圖裡，拖動滑桿只在瀏覽器端切換，不會重新執行頁面；
+# 圖表與它的大小每個資料版本只計算一次，所有 session 共用
+animate_all_years = st.toggle("動畫播放所有年份 (在瀏覽器端切換年份)")
 
-selected_year = st.selectbox(
-    "選擇年份：",
-    available_years  # 使用我們清理後找出的年份列表
-)
+animation_fig = None
+if animate_all_years:
+    animation_fig, payload_bytes = cached_animation_figure(year_index)
+    if animation_fig is None:
+        st.warning(
+            f"所有年份的圖表資料過大 ({payload_bytes / 1024 / 1024:.1f} MB)，"
+            "改用逐年選擇的模式。"
+        )
 
-st.write(f"---")
-st.header(f"{selected_year} 年全球極端貧窮人口比例")
+if animation_fig is not None:
+    st.write(f"---")
+    st.header("全球極端貧窮人口比例 (所有年份)")
+    st.info(f"共 {len(available_years)} 個年份，圖表大小約 {payload_bytes / 1024:.0f} KB。")
+    with span("poverty.plotly_chart"):
+        st.plotly_chart(animation_fig, use_container_width=True)
 
-# --- 4. 根據選擇的年份篩選資料 ---
-# 1. 篩選出該年份的所有國家
-df_year_data = df_countries[df_countries['Year'] == selected_year]
-# 2. 篩選掉該年份中沒有實際貧窮數據的國家
-df_plottable = df_year_data.dropna(subset=[DATA_COLUMN])
+else:
+    st.header("請選擇您想查看的年份")
 
-if df_plottable.empty:
-    st.warning(f"在 {selected_year} 年沒有找到任何國家的貧窮數據。")
-    st.stop()
+    selected_year = st.selectbox(
+        "選擇年份：",
+        available_years  # 使用我們清理後找出的年份列表
+    )
 
+    st.write(f"---")
+    st.header(f"{selected_year} 年全球極端貧窮人口比例")
 
-# --- 5. 建立 3D 地理散點圖 (scatter_geo) ---
-st.info(f"正在顯示 {selected_year} 年，{len(df_plottable)} 個國家/地區的資料。")
-
-fig = px.scatter_geo(
-    df_plottable,
-    
-    locations="Code",        # 國家代碼 (例如 "TWN", "USA")
-    color=DATA_COLUMN,       # 依據貧窮比例上色
-    hover_name="Entity",     # 滑鼠懸停時顯示國家名稱
-    size=DATA_COLUMN,        # 點的大小也代表貧窮比例
-    
-    projection="orthographic", # 3D 地球儀
-    
-    color_continuous_scale=px.colors.sequential.YlOrRd,
-    title=f"全球極端貧窮人口比例 ({selected_year}年)"
-)
+    # --- 4. 根據選擇的年份篩選資料 ---
+    # 直接從年份索引取出該年份「有實際貧窮數據」的國家
+    df_plottable = year_index.get(selected_year)
 
-fig.update_layout(
-    geo=dict(
-        bgcolor= 'rgba(0,0,0,0)', 
-        showland=True,
-        landcolor="rgb(217, 217, 217)", 
-    )
-)
+    if df_plottable.empty:
+        st.warning(f"在 {selected_year} 年沒有找到任何國家的貧窮數據。")
+
+    else:
+        # --- 5. 建立 3D 地理散點圖 (scatter_geo) ---
+        st.info(f"正在顯示 {selected_year} 年，{len(df_plottable)} 個國家/地區的資料。")
+
+        # 同一年份的圖表只建立一次，之後所有 session 都從快取取用
+        with span("poverty.year_figure"):
+            fig = cached_year_figure(year_index, selected_year)
+
+        # --- 6. 在 Streamlit 中顯示 ---
+        with span("poverty.plotly_chart"):
+            st.plotly_chart(fig, use_container_width=True)
 
-# --- 6. 在 Streamlit 中顯示 ---
-st.plotly_chart(fig, use_container_width=True)
+        with st.expander("圖表快取統計 (除錯用)"):
+            cache_stats = year_figure_cache().stats()
+            st.write(
+                f"命中 {cache_stats['hits']} 次、未命中 {cache_stats['misses']} 次、"
+                f"淘汰 {cache_stats['evictions']} 次；"
+                f"共 {cache_stats['entries']} 張圖，使用 "
+                f"{cache_stats['used_bytes'] / 1024 / 1024:.1f} / "
+                f"{cache_stats['budget_bytes'] / 1024 / 1024:.0f} MB"
+            )
 
-st.write("---")
-st.subheader(f"資料來源 ({selected_year}年，已清理並篩選)")
-st.dataframe(df_plottable)
+        st.write("---")
+        st.subheader(f"資料來源 ({selected_year}年，已清理並篩選)")
+        # 分頁表格：排序與篩選在伺服器端完成，瀏覽器一次只收到一頁 (只顯示圖表用到的欄位)
+        with span("poverty.dataframe", rows=len(df_plottable)):
+            paged_table(
+                df_plottable, "poverty_table", (year_index.version, selected_year),
+                columns=["Entity", "Code", "Year", DATA_COLUMN],
+            )
 
 # --- 1. 讀取範例 DEM 資料 ---
 # Plotly 內建的 "volcano" (火山) DEM 數據 (儲存為 CSV)
 # 這是一個 2D 陣列 (Grid)，每個格子的值就是海拔
-z_data = pd.read_csv("https://raw.githubusercontent.com/plotly/datasets/master/api_docs/mt_bruno_elevation.csv")
+# dem_source 會依序使用記憶體快取、磁碟快取 (.cache/dem/) 與專案內的備用檔，
+# rerun 時不會再連網；本機還沒有檔案時會在背景下載 (失敗時隔一段時間重試)，
+# 這次先顯示模擬地形，圖表標題也會跟著改成「模擬地形」
+# 若要改看真實地形，將 DEM_GEOTIFF_FILE 設為 GeoTIFF 檔案路徑，DEM_BOUNDS 設為
+# (最小經度, 最小緯度, 最大經度, 最大緯度)；只會讀取該範圍，長邊最多 DEM_MAX_SIZE 個點
+DEM_GEOTIFF_FILE = None
+DEM_BOUNDS = None
+DEM_MAX_SIZE = 300
+
+if DEM_GEOTIFF_FILE:
+    from dem_raster import load_dem_window
+
+    try:
+        with span("dem.load_geotiff"):
+            dem_window = load_dem_window(DEM_GEOTIFF_FILE, DEM_BOUNDS, DEM_MAX_SIZE)
+    except Exception as e:
+        st.error(f"讀取 DEM 檔案 '{DEM_GEOTIFF_FILE}' 時出錯: {e}")
+        st.stop()
+    # GeoTIFF 第 0 列在北邊，上下翻轉後 y 軸才會往北遞增
+    z_values = np.flipud(dem_window.z)
+    dem_title = f"{os.path.basename(DEM_GEOTIFF_FILE)} 3D 地形圖 (可旋轉)"
+    # 金字塔的名稱：檔名 + 修改時間 + 讀取範圍與大小，檔案改變時會建立新的金字塔
+    surface_key = "_".join([
+        "surface", os.path.splitext(os.path.basename(DEM_GEOTIFF_FILE))[0],
+        str(os.stat(DEM_GEOTIFF_FILE).st_mtime_ns), str(DEM_MAX_SIZE),
+        *(f"{v:.5f}" for v in dem_window.bounds),
+    ])
+else:
+    with span("dem.load"):
+        z_values = load_dem(MT_BRUNO)
+    dem_title = "Mt. Bruno 火山 3D 地形圖 (可旋轉)"
+    dem_path = local_path(MT_BRUNO)
+    surface_key = dem_path and f"surface_{MT_BRUNO.name}_{os.stat(dem_path).st_mtime_ns}"
+if z_values is None:
+    st.info("Mt. Bruno DEM 正在背景下載中，暫時顯示模擬地形，請稍後重新整理頁面。")
+    z_values = gaussian_hill(25)
+    dem_title = "模擬地形 3D 圖 (Mt. Bruno DEM 下載中，可旋轉)"
+    surface_key = None
+
+# 取樣點太多時做自適應簡化：依曲率挑選要保留的列/欄 (山峰、山脊附近較密)，
+# 總數不超過 SURFACE_SAMPLE_BUDGET；設定 SURFACE_MAX_ERROR (公尺) 時，會在預算內
+# 增加取樣點直到還原誤差不超過它
+SURFACE_SAMPLE_BUDGET = 250_000
+SURFACE_MAX_ERROR = None
+
+# 簡化之前，網格先建成多解析度金字塔 (.cache/pyramid/，每層長寬各縮小一半)，
+# 只讀取取樣點數不超過 SURFACE_READ_BUDGET 的最細一層 (memory-map)，
+# 再交給上面的自適應簡化；留一些餘裕讓簡化仍有曲率可以挑選
+SURFACE_READ_BUDGET = 4 * SURFACE_SAMPLE_BUDGET
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def load_surface_pyramid(key, _z):
+    # 每個資料版本只建立一次，所有 session 共用；_z 以底線開頭，Streamlit 不會對它計算雜湊
+    rows, cols = _z.shape
+    return DemPyramid.open_or_build(key, lambda: _z, (0, 0, cols, rows))
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def decimate_dem(dataset_key, _z, sample_budget, max_error, scale):
+    # 第 k 層的每個取樣點代表原始網格的 2^k x 2^k 個點；x / y 換回原始網格的索引
+    rows, cols = _z.shape
+    return decimate_surface(
+        _z, sample_budget, x=np.arange(cols) * scale, y=np.arange(rows) * scale,
+        max_error=max_error,
+    )
+
+
+if not np.isfinite(z_values).any():
+    # 例如 GeoTIFF 的讀取範圍整片都是海面或 nodata
+    st.warning("DEM 的讀取範圍內沒有任何有效的高程值，請調整 DEM_BOUNDS 或換一個檔案。")
+    st.stop()
+
+if surface_key is None:
+    # 模擬地形很小，不需要金字塔
+    surface_level, surface_z = 0, z_values
+    surface_dataset_key = ("synthetic", z_values.shape)
+else:
+    with span("dem.pyramid", samples=int(z_values.size)):
+        surface_pyramid = load_surface_pyramid(surface_key, z_values)
+        surface_level = surface_pyramid.choose_level(SURFACE_READ_BUDGET)
+        surface_z, _ = surface_pyramid.read(surface_level)
+    surface_dataset_key = (surface_key, surface_level)
+
+try:
+    with span("dem.decimate", samples=int(surface_z.size)):
+        surface = decimate_dem(
+            surface_dataset_key, surface_z, SURFACE_SAMPLE_BUDGET, SURFACE_MAX_ERROR,
+            2 ** surface_level,
+        )
+except Exception as e:
+    st.error(f"簡化 DEM 曲面時出錯: {e}")
+    st.stop()
+st.caption(
+    f"曲面取樣點 {surface.samples:,} / {z_values.size:,} (金字塔第 {surface_level} 層)，"
+    f"最大誤差 {surface.max_error:.2f}、RMS 誤差 {surface.rms_error:.2f}，"
+    f"資料大小約 {surface.payload_bytes / 1024:.0f} KB"
+)
 
 # --- 2. 建立 3D Surface 圖 ---
 # 建立一個 Plotly 的 Figure 物件，它是所有圖表元素的容器
@@ -124,9 +218,11 @@ fig = go.Figure(
         go.Surface(
             # *** 關鍵參數：z ***
             # z 參數需要一個 2D 陣列 (或列表的列表)，代表在 X-Y 平面上每個點的高度值。
-            # z_data.values 會提取 pandas DataFrame 底層的 NumPy 2D 陣列。
+            # surface.z 是簡化後的 NumPy 2D 陣列，x / y 為保留下來的 (非等距) 座標。
             # Plotly 會根據這個 2D 陣列的結構來繪製 3D 曲面。
-            z=z_data.values,
+            x=surface.x,
+            y=surface.y,
+            z=surface.z,
 
             # colorscale 參數指定用於根據 z 值 (高度) 對曲面進行著色的顏色映射方案。
             # "Viridis" 是 Plotly 提供的一個常用且視覺效果良好的顏色漸層。
@@ -140,7 +236,7 @@ fig = go.Figure(
 # 使用 update_layout 方法來修改圖表的整體佈局和外觀設定
 fig.update_layout(
     # 設定圖表的標題文字
-    title="Mt. Bruno 火山 3D 地形圖 (可旋轉)",
+    title=dem_title,
 
     # 設定圖表的寬度和高度 (單位：像素)
     width=800,
@@ -161,4 +257,5 @@ fig.update_layout(
 # 這個圖表通常是互動式的，允許使用者用滑鼠旋轉、縮放和平移 3D 視角。
 
 # --- 4. 在 Streamlit 中顯示 ---
-st.plotly_chart(fig)
\ No newline at end of file
+with span("dem.plotly_chart", samples=int(surface.samples)):
+    st.plotly_chart(fig)
@@ -0,0 +1,107 @@
+import collections
+import contextlib
+import functools
+import json
+import time
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+# app.py 側邊欄開關的 key；開啟時才顯示效能面板
+PANEL_KEY = "perf_panel_enabled"
+
+_SPANS_KEY = "_perf_spans"
+_RERUN_KEY = "_perf_rerun"
+
+# 沒有 Streamlit session 時 (例如 benchmarks) 改記錄在這裡，只保留最近的紀錄
+_bare_spans = collections.deque(maxlen=1000)
+
+
+def _span_list():
+    if get_script_run_ctx() is None:
+        return _bare_spans
+    return st.session_state.setdefault(_SPANS_KEY, [])
+
+
+def start_rerun(page):
+    """每次 rerun 開始時呼叫 (由 app.py 負責)，清空上一次的紀錄。"""
+    st.session_state[_SPANS_KEY] = []
+    st.session_state[_RERUN_KEY] = {
+        "page": page,
+        "rerun": st.session_state.get(_RERUN_KEY, {}).get("rerun", 0) + 1,
+        "started_at": time.time(),
+    }
+
+
+@contextlib.contextmanager
+def span(name, **attrs):
+    """量測一段程式的執行時間：with span("tourist.read_csv"): ..."""
+    spans = _span_list()
+    record = {"name": name, "depth": sum(1 for s in spans if "seconds" not in s)}
+    record.update(attrs)
+    spans.append(record)
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record["seconds"] = time.perf_counter() - start
+
+
+def timed(name=None):
+    """span 的裝飾器版本：@timed("poverty.build_figure")"""
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def spans():
+    return list(_span_list())
+
+
+def to_jsonl(records=None):
+    """把紀錄轉成 JSON Lines (每行一個 span)，方便離線分析。"""
+    if records is None:
+        records = spans()
+    rerun = {} if get_script_run_ctx() is None else st.session_state.get(_RERUN_KEY, {})
+    return "".join(
+        json.dumps({**rerun, **record}, ensure_ascii=False, default=str) + "\n"
+        for record in records
+    )
+
+
+def export_jsonl(path, records=None):
+    """把這次 rerun 的紀錄附加到 path (JSON Lines)。"""
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(to_jsonl(records))
+
+
+def render_panel():
+    """在側邊欄顯示這次 rerun 各階段的執行時間。"""
+    records = spans()
+    with st.sidebar:
+        st.subheader("效能面板")
+        if not records:
+            st.caption("這次 rerun 沒有任何紀錄。")
+            return
+        st.dataframe(
+            [
+                {
+                    "階段": "　" * r["depth"] + r["name"],
+                    "時間 (ms)": round(r.get("seconds", 0.0) * 1000, 2),
+                }
+                for r in records
+            ],
+            hide_index=True,
+        )
+        st.download_button(
+            "下載 JSON Lines",
+            to_jsonl(records),
+            file_name="perf_spans.jsonl",
+            mime="application/x-ndjson",
+        )
@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from dem_grid import cell_steps
+
+# 最細一層的格子大小 (公尺)；往上每一層長寬各放大一倍
+BASE_CELL_SIZE = 250
+MAX_LEVELS = 12
+
+# 希望每個格子在畫面上大約佔多少像素；依此從 zoom 挑選層級
+TARGET_CELL_PIXELS = 40
+
+# 最高的格子高度為格子邊長的幾倍
+HEIGHT_PER_CELL = 1
+
+# Web Mercator 在 zoom 0、赤道上每個像素代表的公尺數
+METERS_PER_PIXEL_Z0 = 156_543.034
+
+
+def _merge(col, row, weight, count):
+    # 把 (col, row) 相同的格子合併，加總權重與點數
+    key = col.astype(np.int64) << 32 | (row.astype(np.int64) & 0xFFFFFFFF)
+    unique, inverse = np.unique(key, return_inverse=True)
+    return {
+        "col": (unique >> 32).astype(np.int64),
+        "row": (unique & 0xFFFFFFFF).astype(np.int64),
+        "weight": np.bincount(inverse, weights=weight, minlength=len(unique)),
+        "count": np.bincount(inverse, weights=count, minlength=len(unique)).astype(np.int64),
+    }
+
+
+class ClusterPyramid:
+    """把點分到多層網格的聚合索引：第 0 層格子邊長 BASE_CELL_SIZE 公尺，
+    第 k 層為 2^k 倍。
+
+    只有第 0 層需要掃過所有點；之後每一層都由上一層的格子 (col >> 1, row >> 1)
+    合併而成，成本只和非空格子的數量有關。建立後切換 zoom 只是挑一層並依範圍
+    篩選格子，不需要重新計算。
+    """
+
+    def __init__(self, lon, lat, weight, base_cell_size=BASE_CELL_SIZE, max_levels=MAX_LEVELS):
+        lon = np.asarray(lon, dtype=np.float64)
+        lat = np.asarray(lat, dtype=np.float64)
+        weight = np.nan_to_num(np.asarray(weight, dtype=np.float64))
+        self.extent = (lon.min(), lat.min(), lon.max(), lat.max()) if len(lon) else (0.0, 0.0, 0.0, 0.0)
+        self.base_cell_size = base_cell_size
+        self.lon_step, self.lat_step = cell_steps(base_cell_size, self.extent)
+
+        col = np.floor((lon - self.extent[0]) / self.lon_step)
+        row = np.floor((lat - self.extent[1]) / self.lat_step)
+        self.levels = [_merge(col, row, weight, np.ones_like(weight))]
+        while len(self.levels) < max_levels and len(self.levels[-1]["col"]) > 1:
+            prev = self.levels[-1]
+            self.levels.append(_merge(prev["col"] >> 1, prev["row"] >> 1, prev["weight"], prev["count"]))
+        # 每一層的最大權重在建立時算好：柱高只依層級換算，平移或縮放畫面時不會改變
+        self.max_weights = [
+            float(level["weight"].max()) if len(level["weight"]) and level["weight"].max() > 0 else 1.0
+            for level in self.levels
+        ]
+
+    @property
+    def n_levels(self):
+        return len(self.levels)
+
+    def cell_size(self, level):
+        """第 level 層格子的邊長 (公尺)。"""
+        return self.base_cell_size * 2 ** level
+
+    def level_for_zoom(self, zoom, latitude=None):
+        """挑選格子在畫面上最接近 TARGET_CELL_PIXELS 像素的層級。"""
+        if latitude is None:
+            latitude = (self.extent[1] + self.extent[3]) / 2
+        meters_per_pixel = METERS_PER_PIXEL_Z0 * np.cos(np.radians(latitude)) / 2 ** zoom
+        level = np.log2(TARGET_CELL_PIXELS * meters_per_pixel / self.base_cell_size)
+        return int(np.clip(np.round(level), 0, self.n_levels - 1))
+
+    def cells(self, level, bounds=None):
+        """第 level 層的格子：lon / lat 為左下角 (GridCellLayer 的定位方式)，
+        weight 為權重總和、count 為點數、elevation 為依該層最大權重換算的柱高 (公尺)。
+        指定 bounds 時只回傳與範圍相交的格子。
+        """
+        cells = self.levels[level]
+        scale = 2 ** level
+        lon = self.extent[0] + cells["col"] * self.lon_step * scale
+        lat = self.extent[1] + cells["row"] * self.lat_step * scale
+        keep = slice(None)
+        if bounds is not None:
+            min_lon, min_lat, max_lon, max_lat = bounds
+            keep = (lon + self.lon_step * scale >= min_lon) & (lon <= max_lon) \
+                & (lat + self.lat_step * scale >= min_lat) & (lat <= max_lat)
+        weight = cells["weight"][keep]
+        return pd.DataFrame({
+            "lon": lon[keep],
+            "lat": lat[keep],
+            "weight": weight,
+            "count": cells["count"][keep],
+            "elevation": weight / self.max_weights[level] * self.cell_size(level) * HEIGHT_PER_CELL,
+        })
+
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def cluster_pyramid(dataset_key, _lon, _lat, _weight):
+    # 每個資料版本只建立一次，所有 session 共用
+    return ClusterPyramid(_lon, _lat, _weight)
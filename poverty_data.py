@@ -0,0 +1,271 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from dataset_registry import shared_dataset
+from perf import span, timed
+
+DATA_COLUMN = "Share of population in poverty ($3 a day, 2021 prices)"
+POPULATION_COLUMN = "Population (historical)"
+REGION_COLUMN = "World regions according to OWID"
+
+# 清理後各欄位的型別：重複很多次的字串用 category，Year 的範圍 (-10000 ~ 2100)
+# 放得進 int16；比例用 float32 (約 7 位有效數字，顯示與繪圖都足夠)。
+# 人口超過 2^24 時 float32 無法精確表示整數，改用可為缺值的 Int64 (世界總人口
+# 也放得下，uint32 讀 CSV 時會溢位)
+SCHEMA = {
+    "Entity": "category",
+    "Code": "category",
+    REGION_COLUMN: "category",
+    "Year": "int16",
+    DATA_COLUMN: "float32",
+    POPULATION_COLUMN: "Int64",
+}
+# 讀 CSV 時就能直接指定的型別 (Year 需要先清理才能轉成整數)
+_CSV_DTYPES = {col: dtype for col, dtype in SCHEMA.items() if col != "Year"}
+
+# 串流讀取 CSV 時每一批的列數；讀檔的記憶體峰值只和這個數字有關，與檔案大小無關
+CHUNK_ROWS = 200_000
+
+# SCHEMA 改變時請遞增，舊型別的 Parquet 副本就會被重建
+SCHEMA_VERSION = 3
+
+# 清理後的欄式 (Parquet) 副本存放位置，檔名內含原始 CSV 的雜湊值
+SIDECAR_DIR = ".cache"
+
+# 記錄每個 CSV 的 (路徑, 修改時間, 大小) → 雜湊值；三者都沒變就不必重新讀整個檔案
+MANIFEST_NAME = "manifest.json"
+
+
+class YearIndex:
+    """年份 → 該年「可繪製」資料列的索引。
+
+    建立時把有貧窮數據的列依 Year 排序一次，並記下每個年份的起訖位置，
+    之後切換年份只需要一次字典查詢加上一段連續切片，不必再掃描整個表。
+    """
+
+    def __init__(self, df_plottable):
+        df_sorted = df_plottable.sort_values("Year", kind="stable")
+        years = df_sorted["Year"].to_numpy()
+        unique_years, starts = np.unique(years, return_index=True)
+        stops = np.append(starts[1:], len(years))
+
+        self.frame = df_sorted
+        # 資料內容的雜湊值，讓跨 session 的快取 (例如圖表) 能辨認資料版本
+        self.version = int(pd.util.hash_pandas_object(df_sorted, index=False).sum())
+        self.offsets = {
+            int(year): (int(start), int(stop))
+            for year, start, stop in zip(unique_years, starts, stops)
+        }
+
+    def years(self, reverse=True):
+        return sorted(self.offsets, reverse=reverse)
+
+    def get(self, year):
+        # 沒有資料的年份回傳空的 DataFrame (欄位不變)
+        start, stop = self.offsets.get(int(year), (0, 0))
+        return self.frame.iloc[start:stop]
+
+
+def apply_schema(df):
+    """把存在的欄位轉成 SCHEMA 指定的型別，並移除篩選後已用不到的類別。"""
+    dtypes = {col: dtype for col, dtype in SCHEMA.items() if col in df.columns}
+    df = df.astype(dtypes)
+    for col, dtype in dtypes.items():
+        if dtype == "category":
+            df[col] = df[col].cat.remove_unused_categories()
+    return df
+
+
+def read_raw_csv(csv_path, columns=None, chunksize=None):
+    """讀取原始 CSV；字串欄位直接解析成 category，不會先建立 object 欄位。
+
+    指定 chunksize 時回傳逐批讀取的 iterator (見 iter_clean_chunks)。
+    """
+    return pd.read_csv(csv_path, usecols=columns, dtype=_CSV_DTYPES, chunksize=chunksize)
+
+
+def clean_poverty_data(df_raw):
+    """清理原始 OWID 資料，只保留有 3 位 ISO 代碼的「國家」。
+
+    先算出要保留的列再一次取出，不會複製整個原始表；結果套用 SCHEMA 的型別。
+    """
+    # 轉換 'Year' 欄位為數字
+    year = pd.to_numeric(df_raw['Year'], errors='coerce')
+    # 篩選掉「地區」資料 (只保留有 3 位 ISO 代碼的「國家」)
+    keep = year.notna() & (df_raw['Code'].str.len() == 3)
+    df_clean = df_raw.loc[keep].assign(Year=year[keep])
+    return apply_schema(df_clean)
+
+
+def iter_clean_chunks(csv_path, chunksize=CHUNK_ROWS):
+    """逐批讀取 CSV，每批先篩選再交出，只保留 SCHEMA 裡的欄位。
+
+    每一批只留下有 3 位代碼、且有貧窮數據的國家列，所以同一時間在記憶體中
+    的原始資料最多 chunksize 列。OWID 匯出檔裡其他指標的欄位不會被解析。
+    """
+    chunks = read_raw_csv(csv_path, columns=lambda col: col in SCHEMA, chunksize=chunksize)
+    for chunk in chunks:
+        df_clean = clean_poverty_data(chunk)
+        yield df_clean[df_clean[DATA_COLUMN].notna()]
+
+
+def concat_chunks(chunks):
+    """合併 iter_clean_chunks 的結果；各批的類別不同，先統一成聯集再合併。"""
+    chunks = list(chunks)
+    for col in [c for c, dtype in SCHEMA.items() if dtype == "category"]:
+        if chunks and col in chunks[0].columns:
+            categories = sorted(set().union(*(chunk[col].cat.categories for chunk in chunks)))
+            chunks = [
+                chunk.assign(**{col: chunk[col].cat.set_categories(categories)})
+                for chunk in chunks
+            ]
+    return pd.concat(chunks, ignore_index=True)
+
+
+@timed("poverty.build_year_index")
+def build_year_index(df_countries):
+    # 只有實際貧窮數據的列才需要被索引
+    return YearIndex(df_countries.dropna(subset=[DATA_COLUMN]))
+
+
+def file_sha256(file_path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _read_manifest(manifest_path):
+    try:
+        with open(manifest_path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def csv_digest(csv_path, sidecar_dir=SIDECAR_DIR):
+    """回傳 CSV 的 SHA-256；(路徑, 修改時間, 大小) 與上次相同時直接取 manifest 的紀錄。
+
+    只有檔案被修改 (或第一次看到) 時才會讀完整個檔案計算雜湊值，
+    數 GB 的 CSV 在冷啟動時也只需要一次 os.stat。
+    """
+    stat = os.stat(csv_path)
+    key = os.path.abspath(csv_path)
+    signature = [stat.st_mtime_ns, stat.st_size]
+    manifest_path = os.path.join(sidecar_dir, MANIFEST_NAME)
+    manifest = _read_manifest(manifest_path)
+    entry = manifest.get(key)
+    if entry and entry.get("signature") == signature:
+        return entry["sha256"]
+
+    digest = file_sha256(csv_path)
+    manifest[key] = {"signature": signature, "sha256": digest}
+    os.makedirs(sidecar_dir, exist_ok=True)
+    tmp_path = f"{manifest_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, manifest_path)
+    return digest
+
+
+def sidecar_path(csv_path, digest, sidecar_dir=SIDECAR_DIR):
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(sidecar_dir, f"{stem}.{digest[:16]}.s{SCHEMA_VERSION}.parquet")
+
+
+def ingest_poverty_csv(csv_path, sidecar_dir=SIDECAR_DIR):
+    """把原始 CSV 清理後寫成 Parquet 副本，回傳副本路徑。
+
+    副本只保留有 3 位代碼、且有貧窮數據的國家列 (欄位型別見 SCHEMA)，
+    所以 Year=-10000 這類史前的空白資料不會再被讀取。CSV 內容改變時
+    雜湊值不同，會自動重建副本並刪除舊的副本；雜湊值依 (路徑, 修改時間, 大小)
+    記在 manifest 裡，檔案沒變時不會重新讀取 (見 csv_digest)。
+    CSV 以 CHUNK_ROWS 列為一批串流處理，檔案再大記憶體用量也有上限。
+    需要 pyarrow；沒有安裝時拋出 ImportError。
+    """
+    digest = csv_digest(csv_path, sidecar_dir)
+    path = sidecar_path(csv_path, digest, sidecar_dir)
+    if os.path.exists(path):
+        return path
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    os.makedirs(sidecar_dir, exist_ok=True)
+    tmp_path = path + ".tmp"
+    writer = None
+    with span("poverty.ingest_csv"):
+        # 逐批清理並寫入，完整的原始表或結果都不會同時放在記憶體中
+        for chunk in iter_clean_chunks(csv_path):
+            if writer is None:
+                # 以第一批決定欄位型別；類別欄位固定用 int32 索引，各批的 schema 才會一致
+                schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+                for i, field in enumerate(schema):
+                    if pa.types.is_dictionary(field.type):
+                        schema = schema.set(i, field.with_type(pa.dictionary(pa.int32(), pa.string())))
+                writer = pq.ParquetWriter(tmp_path, schema)
+            elif chunk.empty:
+                continue
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+    if writer is None:
+        raise ValueError(f"'{csv_path}' 沒有任何資料")
+    writer.close()
+    os.replace(tmp_path, path)
+
+    # 刪除同一個 CSV 舊版本的副本
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    for name in os.listdir(sidecar_dir):
+        if (name.startswith(stem + ".") and name.endswith(".parquet")
+                and name != os.path.basename(path)):
+            os.remove(os.path.join(sidecar_dir, name))
+    return path
+
+
+@timed("poverty.read_table")
+def read_poverty_table(csv_path, columns=None):
+    """讀取清理後的貧窮資料；優先讀 Parquet 副本，並只載入 columns 指定的欄位。"""
+    try:
+        df_plottable = pd.read_parquet(ingest_poverty_csv(csv_path), columns=columns)
+    except ImportError:
+        # 沒有 pyarrow：退回逐批解析 CSV (記憶體中只保留篩選後的列)
+        df_plottable = concat_chunks(iter_clean_chunks(csv_path))
+        return df_plottable if columns is None else df_plottable[columns]
+    # Parquet 裡的類別可能包含被篩掉的值 (各批的聯集)
+    return apply_schema(df_plottable)
+
+
+def _build_poverty_dataset(file_path, columns):
+    df_countries = read_poverty_table(file_path, columns)
+    # 建立年份索引，並找出所有可用的年份 (只找有實際貧窮數據的年份)
+    year_index = build_year_index(df_countries)
+    # 副本裡已經只有可繪製的列，兩者內容相同；只保留索引排序後的那一份，
+    # 登錄表就不會把同樣的資料凍結、存放兩次
+    return year_index.frame, year_index.years(), year_index
+
+
+def load_and_clean_data(file_path, columns=None):
+    """回傳 (df_countries, available_years, year_index)，失敗時回傳三個 None。
+
+    (重要) 結果放在共用的唯讀資料集登錄表，所有 session 共用同一份，
+    不會像 st.cache_data 一樣每次取用都複製；CSV 被修改時自動重新讀取。
+    """
+    try:
+        stat = os.stat(file_path)
+        return shared_dataset(
+            f"poverty:{os.path.basename(file_path)}:{','.join(columns or ['*'])}",
+            (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size),
+            lambda: _build_poverty_dataset(file_path, columns),
+        )
+    except FileNotFoundError:
+        st.error(f"錯誤：找不到您的原始檔案 '{file_path}'。")
+        st.error("請確保您已將原始的 ZIP 檔案內容上傳到 GitHub (與 app.py 放在一起)。")
+        return None, None, None
+    except Exception as e:
+        st.error(f"讀取或清理資料時出錯: {e}")
+        return None, None, None
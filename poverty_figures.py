@@ -0,0 +1,143 @@
+import plotly.graph_objects as go
+import streamlit as st
+from plotly.colors import sequential
+
+from figure_cache import FigureCache
+from perf import timed
+from poverty_data import DATA_COLUMN
+
+# 動畫模式的圖表 JSON 上限 (位元組)；超過時改回「每次選一個年份」的模式
+MAX_ANIMATION_BYTES = 8 * 1024 * 1024
+
+# 逐年圖表快取的記憶體預算 (位元組)，所有 session 共用
+FIGURE_CACHE_BUDGET_BYTES = 32 * 1024 * 1024
+
+# 與 px.scatter_geo 預設相同的最大點大小 (像素)
+MAX_MARKER_SIZE = 20
+
+GEO_LAYOUT = dict(
+    bgcolor='rgba(0,0,0,0)',
+    showland=True,
+    landcolor="rgb(217, 217, 217)",
+)
+
+
+@timed("poverty.build_figure")
+def build_year_figure(df_plottable, year):
+    """單一年份的 3D 地球儀散點圖。"""
+    # plotly.express 載入較慢，只有在快取沒命中、真的要建圖時才匯入
+    import plotly.express as px
+
+    fig = px.scatter_geo(
+        df_plottable,
+
+        locations="Code",        # 國家代碼 (例如 "TWN", "USA")
+        color=DATA_COLUMN,       # 依據貧窮比例上色
+        hover_name="Entity",     # 滑鼠懸停時顯示國家名稱
+        size=DATA_COLUMN,        # 點的大小也代表貧窮比例
+
+        projection="orthographic", # 3D 地球儀
+
+        color_continuous_scale=px.colors.sequential.YlOrRd,
+        title=f"全球極端貧窮人口比例 ({year}年)"
+    )
+    fig.update_layout(geo=GEO_LAYOUT)
+    return fig
+
+
+@st.cache_resource
+def year_figure_cache():
+    return FigureCache(FIGURE_CACHE_BUDGET_BYTES)
+
+
+def cached_year_figure(year_index, year):
+    """從跨 session 共用的 LRU 快取取得該年份的圖表，沒有時才建立。"""
+    return year_figure_cache().get_or_build(
+        (year_index.version, int(year)),
+        lambda: build_year_figure(year_index.get(year), year),
+    )
+
+
+def _year_trace(df_year):
+    # 每個 frame 只放會隨年份變動的資料，樣式都放在第一個 trace 和 layout 裡
+    # (比例欄位是 float32，先轉回 float64 再四捨五入，JSON 才不會出現 0.30000001192…)
+    values = df_year[DATA_COLUMN].astype("float64").round(3).tolist()
+    return go.Scattergeo(
+        locations=df_year["Code"].astype(str).tolist(),
+        hovertext=df_year["Entity"].astype(str).tolist(),
+        marker=dict(color=values, size=values),
+    )
+
+
+@timed("poverty.build_animation")
+def build_animation_figure(year_index, max_bytes=MAX_ANIMATION_BYTES):
+    """把所有年份放進同一張圖的 frames，並加上滑桿與播放按鈕。
+
+    切換年份完全在瀏覽器端完成，不會觸發 Streamlit rerun。
+    回傳 (fig, payload_bytes)；圖表 JSON 超過 max_bytes 時 fig 為 None。
+    """
+    years = year_index.years(reverse=False)
+    frame_data = year_index.frame
+    max_value = float(frame_data[DATA_COLUMN].max()) or 1.0
+
+    first = _year_trace(year_index.get(years[0]))
+    first.update(
+        mode="markers",
+        hovertemplate="<b>%{hovertext}</b><br>%{marker.color}<extra></extra>",
+        marker=dict(
+            coloraxis="coloraxis",
+            sizemode="area",
+            sizeref=2.0 * max_value / (MAX_MARKER_SIZE ** 2),
+            sizemin=0,
+        ),
+    )
+    frames = [
+        go.Frame(name=str(year), data=[_year_trace(year_index.get(year))])
+        for year in years
+    ]
+
+    def animate_args(names, duration):
+        return [names, {"frame": {"duration": duration, "redraw": True},
+                        "transition": {"duration": 0}, "mode": "immediate"}]
+
+    fig = go.Figure(data=[first], frames=frames)
+    fig.update_layout(
+        title="全球極端貧窮人口比例 (所有年份)",
+        geo=dict(projection_type="orthographic", **GEO_LAYOUT),
+        coloraxis=dict(
+            colorscale=sequential.YlOrRd,
+            cmin=0, cmax=max_value,   # 所有年份共用同一個色階
+            colorbar=dict(title=dict(text=DATA_COLUMN)),
+        ),
+        sliders=[dict(
+            active=0,
+            currentvalue=dict(prefix="年份："),
+            steps=[dict(label=str(year), method="animate",
+                        args=animate_args([str(year)], 0)) for year in years],
+        )],
+        updatemenus=[dict(
+            type="buttons", showactive=False, x=0, y=0, xanchor="right", yanchor="top",
+            buttons=[
+                dict(label="▶", method="animate", args=animate_args(None, 300)),
+                dict(label="❚❚", method="animate", args=animate_args([None], 0)),
+            ],
+        )],
+    )
+
+    payload_bytes = len(fig.to_json())
+    if payload_bytes > max_bytes:
+        return None, payload_bytes
+    return fig, payload_bytes
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def _animation_figure(version, _year_index, max_bytes):
+    return build_animation_figure(_year_index, max_bytes)
+
+
+def cached_animation_figure(year_index, max_bytes=MAX_ANIMATION_BYTES):
+    """跨 session 共用的動畫圖表：每個資料版本 (year_index.version) 只建立並量測一次。
+
+    回傳值與 build_animation_figure 相同；Figure 由所有 session 共用，取出後請勿修改。
+    """
+    return _animation_figure(year_index.version, year_index, max_bytes)
@@ -0,0 +1,73 @@
+import numpy as np
+import streamlit as st
+
+# 每個格子平均放幾個點；決定格子的大小
+POINTS_PER_CELL = 32
+
+
+class GridIndex:
+    """以均勻網格分桶的點索引 (CSR 格式)，用來找出某個範圍內的點。
+
+    建立時把每個點分到一個格子，並依格子編號排序一次；查詢時同一列格子
+    在排序後是連續的一段，所以只需要對涵蓋範圍的每一列做一次切片，
+    成本與範圍內的格子列數和點數成正比，與資料總數無關。
+    """
+
+    def __init__(self, lon, lat, points_per_cell=POINTS_PER_CELL):
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.lat = np.asarray(lat, dtype=np.float64)
+        n = len(self.lon)
+        if n:
+            self.extent = (self.lon.min(), self.lat.min(), self.lon.max(), self.lat.max())
+        else:
+            self.extent = (0.0, 0.0, 0.0, 0.0)
+        min_lon, min_lat, max_lon, max_lat = self.extent
+        width, height = max(max_lon - min_lon, 1e-9), max(max_lat - min_lat, 1e-9)
+
+        # 格子數約為 n / points_per_cell，依範圍的長寬比分配成列與欄
+        n_cells = max(1, n // points_per_cell)
+        self.n_cols = max(1, int(round(np.sqrt(n_cells * width / height))))
+        self.n_rows = max(1, int(round(n_cells / self.n_cols)))
+        self.cell_lon = width / self.n_cols
+        self.cell_lat = height / self.n_rows
+
+        cols, rows = self._cell(self.lon, self.lat)
+        cell_ids = rows * self.n_cols + cols
+        self.order = np.argsort(cell_ids, kind="stable")
+        # offsets[c] ~ offsets[c + 1] 是第 c 個格子的點在 order 中的位置
+        self.offsets = np.searchsorted(cell_ids[self.order], np.arange(self.n_rows * self.n_cols + 1))
+
+    def _cell(self, lon, lat):
+        cols = np.clip(((lon - self.extent[0]) / self.cell_lon).astype(np.int64), 0, self.n_cols - 1)
+        rows = np.clip(((lat - self.extent[1]) / self.cell_lat).astype(np.int64), 0, self.n_rows - 1)
+        return cols, rows
+
+    def __len__(self):
+        return len(self.lon)
+
+    def query(self, bounds):
+        """回傳落在 bounds (min_lon, min_lat, max_lon, max_lat) 內的點的位置 (遞增排序)。"""
+        min_lon, min_lat, max_lon, max_lat = bounds
+        e_min_lon, e_min_lat, e_max_lon, e_max_lat = self.extent
+        if len(self) == 0 or min_lon > e_max_lon or max_lon < e_min_lon \
+                or min_lat > e_max_lat or max_lat < e_min_lat:
+            return np.empty(0, dtype=np.int64)
+
+        (col0, col1), (row0, row1) = (
+            self._cell(np.array([min_lon, max_lon]), np.array([min_lat, max_lat]))
+        )
+        # 每一列格子 [col0, col1] 在 order 裡是連續的一段
+        starts = self.offsets[np.arange(row0, row1 + 1) * self.n_cols + col0]
+        stops = self.offsets[np.arange(row0, row1 + 1) * self.n_cols + col1 + 1]
+        candidates = np.concatenate([self.order[a:b] for a, b in zip(starts, stops)])
+
+        # 邊界上的格子只有部分在範圍內，再精確篩選一次
+        lon, lat = self.lon[candidates], self.lat[candidates]
+        inside = (lon >= min_lon) & (lon <= max_lon) & (lat >= min_lat) & (lat <= max_lat)
+        return np.sort(candidates[inside])
+
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def grid_index(dataset_key, _lon, _lat):
+    # 每個資料版本只建立一次，所有 session 共用；_lon / _lat 不計算雜湊
+    return GridIndex(_lon, _lat)
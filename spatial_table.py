@@ -0,0 +1,212 @@
+import csv
+import io
+import os
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from dataset_registry import shared_dataset
+from perf import span
+
+# long: 一般的表格，每一列是一個地點、每一欄是一個屬性
+# wide: 「屬性為列、地點為欄」，第一欄是屬性名稱 (例如 lat / lon / 遊客人數)
+ORIENTATIONS = ("auto", "long", "wide")
+
+LAT_RANGE = (-90.0, 90.0)
+LON_RANGE = (-180.0, 180.0)
+
+
+class MissingColumnsError(KeyError):
+    """找不到指定的欄位 (wide 格式時為「橫列標題」)。"""
+
+    def __init__(self, required, actual):
+        super().__init__(sorted(required - set(actual)))
+        self.required = required
+        self.actual = list(actual)
+
+
+@dataclass(frozen=True)
+class ValidationReport:
+    rows_in: int
+    dropped: dict = field(default_factory=dict)   # 原因 -> 被移除的列數 (同一列可能有多個原因)
+    rows_out: int = 0
+
+
+@dataclass(frozen=True)
+class LoadTiming:
+    cache_hit: bool        # 這次是否直接命中快取 (沒有碰到磁碟)
+    cold_seconds: float    # 第一次 (冷) 載入時，讀檔 + 正規化 + 驗證所花的時間
+    call_seconds: float    # 這次呼叫實際花費的時間 (命中時就是快取讀取時間)
+
+
+@dataclass(frozen=True)
+class SpatialTable:
+    frame: pd.DataFrame    # 每個地點一列：名稱、緯度、經度與數值欄位 (float64)
+    orientation: str       # 實際使用的格式 (long / wide)
+    report: ValidationReport
+    cold_seconds: float
+    version: tuple         # 資料版本 (檔案路徑, 修改時間, 檔案大小, 欄位設定)，可當作其他快取的鍵
+
+
+def file_signature(file_path):
+    """回傳 (絕對路徑, mtime, 檔案大小)，檔案被修改後快取鍵就會改變。"""
+    stat = os.stat(file_path)
+    return os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size
+
+
+def _open(path):
+    # utf-8-sig 會去掉 Excel 存檔時加在開頭的 BOM
+    return open(path, newline="", encoding="utf-8-sig")
+
+
+def detect_orientation(path, lat_col, lon_col):
+    """標題列有 lat / lon 欄位時為 long，否則為 wide。"""
+    with _open(path) as f:
+        header = next(csv.reader(f), [])
+    return "long" if {lat_col, lon_col}.issubset(header) else "wide"
+
+
+def _read_long(path, name_col, columns):
+    header = pd.read_csv(path, nrows=0, encoding="utf-8-sig").columns
+    name_col = name_col or header[0]
+    required = {name_col, *columns}
+    if not required.issubset(header):
+        raise MissingColumnsError(required, header)
+    data = pd.read_csv(path, usecols=list(required), encoding="utf-8-sig")
+    return data[[name_col, *columns]], name_col
+
+
+def _parse_float_row(text, length):
+    """把一列以逗號分隔的數值直接解析成長度為 length 的 float64 陣列。
+
+    把逗號換成換行後交給 pandas 的 C parser 當成單一欄位讀取，數值直接
+    解析成 float，不會先建立每個值的 Python 字串；空白欄位為 NaN。
+    """
+    if not text:
+        return np.full(length, np.nan)
+    if '"' in text:
+        # 有引號的欄位 (例如 "1,234") 交給 csv 模組切開，再去掉千分位逗號
+        fields = [field.replace(",", "") for field in next(csv.reader([text]))]
+        values = pd.to_numeric(pd.Series(fields), errors="coerce")
+    else:
+        column = pd.read_csv(
+            io.StringIO(text.replace(",", "\n")), header=None, names=["v"], skip_blank_lines=False
+        )["v"]
+        # 全部都是數字時已經是 float64；夾雜文字時才需要逐一轉換
+        values = column if column.dtype.kind in "fi" else pd.to_numeric(column, errors="coerce")
+    values = values.to_numpy(dtype=np.float64)[:length]
+    if len(values) < length:
+        # 結尾的空白欄位可能被省略，補成缺值
+        values = np.concatenate([values, np.full(length - len(values), np.nan)])
+    return values
+
+
+def _read_wide(path, name_col, columns):
+    # 逐行讀取，只解析需要的屬性列，不把整張表讀成 object 再轉置
+    wanted = set(columns)
+    rows = {}
+    attributes = []
+    with _open(path) as f:
+        header = next(csv.reader([f.readline()]), [])
+        names = header[1:]
+        for line in f:
+            line = line.rstrip("\r\n")
+            if not line:
+                continue
+            if line.startswith('"'):
+                # 屬性名稱有引號 (可能含有逗號) 時才交給 csv 模組切開
+                attribute, *fields = next(csv.reader([line]))
+                rest = ",".join(fields)
+            else:
+                attribute, _, rest = line.partition(",")
+            attributes.append(attribute)
+            if attribute in wanted:
+                rows[attribute] = rest
+    name_col = name_col or header[0]
+    if not wanted.issubset(rows):
+        raise MissingColumnsError({name_col, *columns}, [name_col, *attributes])
+
+    data = {name_col: np.array(names, dtype=object)}
+    for col in columns:
+        data[col] = _parse_float_row(rows[col], len(names))
+    return data, name_col
+
+
+def validate(data, lat_col, lon_col, numeric_cols):
+    """一次檢查所有數值欄位與座標範圍，回傳 (數值矩陣, 要保留的列, ValidationReport)。
+
+    data 可以是 DataFrame 或「欄位名稱 -> 陣列」的 dict。數值欄位轉成 float64
+    (已經是 float 的欄位不會再轉換，無法轉換的值變成 NaN)；缺值、非數字、
+    緯度不在 -90~90 或經度不在 -180~180 的列都會被標記為移除。
+    """
+    values = np.column_stack([
+        pd.to_numeric(pd.Series(data[col]), errors="coerce").to_numpy(dtype=np.float64)
+        for col in numeric_cols
+    ])
+    invalid = np.isnan(values)
+    lat = values[:, numeric_cols.index(lat_col)]
+    lon = values[:, numeric_cols.index(lon_col)]
+    lat_out = (lat < LAT_RANGE[0]) | (lat > LAT_RANGE[1])
+    lon_out = (lon < LON_RANGE[0]) | (lon > LON_RANGE[1])
+    keep = ~(invalid.any(axis=1) | lat_out | lon_out)
+
+    counts = invalid.sum(axis=0)
+    dropped = {f"{col} 缺值或不是數字": int(n) for col, n in zip(numeric_cols, counts) if n}
+    if lat_out.any():
+        dropped[f"{lat_col} 超出 {LAT_RANGE[0]:g}~{LAT_RANGE[1]:g}"] = int(lat_out.sum())
+    if lon_out.any():
+        dropped[f"{lon_col} 超出 {LON_RANGE[0]:g}~{LON_RANGE[1]:g}"] = int(lon_out.sum())
+    report = ValidationReport(rows_in=len(keep), dropped=dropped, rows_out=int(keep.sum()))
+    return values, keep, report
+
+
+def _build(abs_path, lat_col, lon_col, value_cols, name_col, orientation, version=None):
+    start = time.perf_counter()
+    numeric_cols = list(dict.fromkeys([lat_col, lon_col, *value_cols]))
+
+    if orientation == "auto":
+        orientation = detect_orientation(abs_path, lat_col, lon_col)
+    with span("spatial.read", orientation=orientation):
+        reader = _read_wide if orientation == "wide" else _read_long
+        data, name_col = reader(abs_path, name_col, numeric_cols)
+
+    with span("spatial.validate"):
+        values, keep, report = validate(data, lat_col, lon_col, numeric_cols)
+        # 一次組出最終的欄式 DataFrame：名稱為字串，其餘欄位為 float64
+        frame = pd.DataFrame({
+            name_col: np.asarray(data[name_col])[keep],
+            **{col: values[keep, i] for i, col in enumerate(numeric_cols)},
+        })
+
+    return SpatialTable(frame, orientation, report, time.perf_counter() - start, version)
+
+
+def load_spatial_table(file_path, lat_col, lon_col, value_cols=(), name_col=None,
+                       orientation="auto", ttl=None):
+    """讀取含座標的表格 (long 或 wide 格式)，正規化成每個地點一列並驗證。
+
+    回傳 (SpatialTable, LoadTiming)。結果放在共用的唯讀資料集登錄表，依
+    (檔案路徑, 修改時間, 檔案大小) 與欄位設定快取。找不到欄位時拋出
+    MissingColumnsError，檔案不存在時拋出 FileNotFoundError。
+    """
+    if orientation not in ORIENTATIONS:
+        raise ValueError(f"不支援的格式: {orientation}")
+    start = time.perf_counter()
+    abs_path, mtime_ns, size = file_signature(file_path)
+    value_cols = tuple(value_cols)
+    version = (abs_path, mtime_ns, size, lat_col, lon_col, value_cols, name_col, orientation)
+    table, built = shared_dataset(
+        f"spatial:{os.path.basename(abs_path)}:{','.join([lat_col, lon_col, *value_cols])}",
+        version,
+        lambda: _build(abs_path, lat_col, lon_col, value_cols, name_col, orientation, version),
+        ttl=ttl,
+        return_built=True,
+    )
+    timing = LoadTiming(
+        cache_hit=not built,
+        cold_seconds=table.cold_seconds,
+        call_seconds=time.perf_counter() - start,
+    )
+    return table, timing
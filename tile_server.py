@@ -0,0 +1,223 @@
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 已算好的圖磚存放位置與容量上限 (超過時刪除最久沒用到的圖磚)
+TILE_CACHE_DIR = os.path.join(".cache", "tiles")
+TILE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# 瀏覽器連到圖磚伺服器時使用的主機名稱；部署在遠端時請改成瀏覽器連得到的位址
+TILE_SERVER_HOST = "127.0.0.1"
+
+# 每種樣式傳給 localtileserver 的 colormap
+#   elevation: 灰階，給 TerrainLayer 解碼成高度 (0..255 對應 vmin..vmax)
+#   texture  : 地形色階，貼在 3D 地形表面 (TerrainLayer 會再加上光影)
+STYLES = {
+    "elevation": "gray",
+    "texture": "terrain",
+}
+
+_TILE_PATH = re.compile(r"^/(\w+)/(\d+)/(\d+)/(\d+)\.png$")
+
+
+class DiskTileCache:
+    """以總大小為上限的磁碟 LRU：每張圖磚一個檔案，檔案的 mtime 代表最後使用時間。"""
+
+    def __init__(self, root=TILE_CACHE_DIR, max_bytes=TILE_CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # 相對路徑 -> 檔案大小，越後面越新
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # 伺服器重啟後沿用磁碟上既有的圖磚 (依 mtime 排序)
+        existing = []
+        for dirpath, _, filenames in os.walk(root):
+            for name in filenames:
+                if name.endswith(".png"):
+                    path = os.path.join(dirpath, name)
+                    stat = os.stat(path)
+                    existing.append((stat.st_mtime, os.path.relpath(path, root), stat.st_size))
+        for _, key, size in sorted(existing):
+            self._entries[key] = size
+            self.used_bytes += size
+        self._evict()
+
+    def get(self, key):
+        path = os.path.join(self.root, key)
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        try:
+            os.utime(path)
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            with self._lock:
+                self.used_bytes -= self._entries.pop(key, 0)
+            return None
+
+    def put(self, key, data):
+        path = os.path.join(self.root, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp{threading.get_ident()}"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self.used_bytes += len(data) - self._entries.pop(key, 0)
+            self._entries[key] = len(data)
+            self._evict()
+
+    def drop_prefix(self, prefix):
+        """刪除 key 以 prefix 開頭的所有圖磚 (例如被取代的舊版 GeoTIFF)。"""
+        with self._lock:
+            keys = [key for key in self._entries if key.startswith(prefix)]
+            for key in keys:
+                self.used_bytes -= self._entries.pop(key)
+        for key in keys:
+            try:
+                os.remove(os.path.join(self.root, key))
+            except FileNotFoundError:
+                pass
+
+    def _evict(self):
+        while self.used_bytes > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self.used_bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(os.path.join(self.root, key))
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                "tiles": len(self._entries),
+                "used_bytes": self.used_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class RasterTileServer:
+    """在目前行程中提供 GeoTIFF 的 XYZ 圖磚。
+
+    圖磚由 localtileserver 的 TileClient 產生 (只讀取該圖磚範圍的資料)，
+    產生過的圖磚存進 DiskTileCache；瀏覽器只會請求畫面內的圖磚。
+    快取的 key 以 tile_prefix 開頭：包含檔案的完整路徑、修改時間與灰階對應的
+    vmin / vmax，檔案被修改或不同資料夾有同名檔案時不會讀到別人的圖磚。
+    """
+
+    def __init__(self, path, cache=None, host=TILE_SERVER_HOST, port=0):
+        from localtileserver import TileClient
+
+        self.path = os.path.abspath(path)
+        self.mtime_ns = os.stat(self.path).st_mtime_ns
+        self.client = TileClient(self.path)
+        self.cache = cache or DiskTileCache()
+        band = self.client.statistics()
+        stats = next(iter(band.values())) if isinstance(band, dict) else band[0]
+        self.vmin, self.vmax = float(stats["min"]), float(stats["max"])
+        name = re.sub(r"\W", "_", os.path.splitext(os.path.basename(self.path))[0])
+        path_hash = hashlib.sha1(self.path.encode("utf-8")).hexdigest()[:8]
+        self.tile_prefix = f"{name}-{path_hash}/{self.mtime_ns}-{self.vmin:.6g}-{self.vmax:.6g}/"
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                match = _TILE_PATH.match(self.path)
+                if match is None or match.group(1) not in STYLES:
+                    self.send_error(404)
+                    return
+                style, z, x, y = match.group(1), *map(int, match.groups()[1:])
+                try:
+                    data = server.render(style, z, x, y)
+                except Exception:
+                    # 影像範圍外的圖磚
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "image/png")
+                self.send_header("Access-Control-Allow-Origin", "*")
+                self.send_header("Cache-Control", "public, max-age=86400")
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.host, self.port = host, self.httpd.server_address[1]
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def render(self, style, z, x, y):
+        key = f"{self.tile_prefix}{style}/{z}/{x}/{y}.png"
+        data = self.cache.get(key)
+        if data is None:
+            data = self.client.tile(
+                z, x, y, colormap=STYLES[style], vmin=self.vmin, vmax=self.vmax
+            )
+            self.cache.put(key, data)
+        return data
+
+    def url_template(self, style):
+        return f"http://{self.host}:{self.port}/{style}/{{z}}/{{x}}/{{y}}.png"
+
+    def elevation_decoder(self):
+        """灰階圖磚 (0..255) 還原成高度的係數，給 pdk TerrainLayer 使用。"""
+        return {
+            "rScaler": (self.vmax - self.vmin) / 255,
+            "gScaler": 0,
+            "bScaler": 0,
+            "offset": self.vmin,
+        }
+
+    def bounds(self):
+        """影像範圍 (min_lon, min_lat, max_lon, max_lat)。"""
+        south, north, west, east = self.client.bounds()
+        return west, south, east, north
+
+    def shutdown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.client.shutdown()
+
+
+class TileServerPool:
+    """每個 GeoTIFF 一個 RasterTileServer，全部共用同一個 DiskTileCache。
+
+    檔案被修改 (mtime 改變) 時關閉舊的伺服器、刪除它的圖磚，再啟動新的伺服器，
+    所以 TILE_CACHE_MAX_BYTES 是所有伺服器合計的上限，舊版本的執行緒也不會留著。
+    """
+
+    def __init__(self, cache=None):
+        self.cache = cache or DiskTileCache()
+        self._servers = {}   # 絕對路徑 -> RasterTileServer
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        path = os.path.abspath(path)
+        mtime_ns = os.stat(path).st_mtime_ns
+        with self._lock:
+            server = self._servers.get(path)
+            if server is not None and server.mtime_ns == mtime_ns:
+                return server
+            if server is not None:
+                server.shutdown()
+                self.cache.drop_prefix(server.tile_prefix)
+            server = self._servers[path] = RasterTileServer(path, self.cache)
+            return server
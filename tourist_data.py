@@ -0,0 +1,22 @@
+from perf import timed
+from spatial_table import LoadTiming, MissingColumnsError, load_spatial_table  # noqa: F401
+
+# 景點名稱欄位 (CSV 第一欄轉置後的名稱)
+NAME_COL = "景點名稱"
+
+# 多久後強制重新讀檔 (秒)；檔案被修改時則會立即重新讀取
+CACHE_TTL_SECONDS = 60 * 60
+
+
+@timed("tourist.load")
+def load_tourist_table(file_path, lat_col, lon_col, weight_col):
+    """讀取景點 CSV (「屬性為列、景點為欄」或一般的表格皆可)，結果跨 rerun 與 session 共用。
+
+    回傳 (SpatialTable, LoadTiming)；SpatialTable.frame 是所有 session 共用的唯讀
+    資料 (見 dataset_registry)，請勿就地修改。找不到欄位時拋出 MissingColumnsError，
+    檔案不存在時拋出 FileNotFoundError。
+    """
+    return load_spatial_table(
+        file_path, lat_col, lon_col, value_cols=[weight_col],
+        name_col=NAME_COL, ttl=CACHE_TTL_SECONDS,
+    )
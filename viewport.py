@@ -0,0 +1,68 @@
+import numpy as np
+
+# Web Mercator 在 zoom 0 時，整個世界寬 256 像素
+TILE_SIZE = 256
+
+# 預設的地圖畫面大小 (像素)，用來估計目前畫面涵蓋的範圍
+VIEWPORT_WIDTH = 1000
+VIEWPORT_HEIGHT = 700
+
+# fit_zoom 最大的縮放等級 (範圍很小或只有一個點時)
+MAX_ZOOM = 16
+
+# Web Mercator 可表示的緯度範圍
+MAX_LATITUDE = 85.05112878
+
+
+def world_pixels(lon, lat, zoom):
+    """經緯度換算成 Web Mercator 在 zoom 層級的世界像素座標 (x 向右、y 向下)。"""
+    scale = TILE_SIZE * 2 ** zoom
+    lat = np.clip(np.asarray(lat, dtype=np.float64), -MAX_LATITUDE, MAX_LATITUDE)
+    x = (np.asarray(lon, dtype=np.float64) + 180.0) / 360.0 * scale
+    sin = np.sin(np.radians(lat))
+    y = (0.5 - np.log((1 + sin) / (1 - sin)) / (4 * np.pi)) * scale
+    return x, y
+
+
+def view_bounds(latitude, longitude, zoom, width=VIEWPORT_WIDTH, height=VIEWPORT_HEIGHT):
+    """估計 ViewState 在畫面上涵蓋的 (min_lon, min_lat, max_lon, max_lat)。
+
+    以畫面中心的緯度換算，不考慮 pitch 造成的透視變形 (傾斜時會低估遠處範圍，
+    使用時請另外加上 margin)。
+    """
+    degrees_per_pixel = 360.0 / (TILE_SIZE * 2 ** zoom)
+    half_lon = width / 2 * degrees_per_pixel
+    half_lat = height / 2 * degrees_per_pixel * np.cos(np.radians(latitude))
+    return (
+        longitude - half_lon,
+        max(latitude - half_lat, -90.0),
+        longitude + half_lon,
+        min(latitude + half_lat, 90.0),
+    )
+
+
+def expand_bounds(bounds, margin):
+    """把範圍往四周各擴大 margin 倍 (例如 0.25 代表每邊多 25%)。"""
+    min_lon, min_lat, max_lon, max_lat = bounds
+    d_lon = (max_lon - min_lon) * margin
+    d_lat = (max_lat - min_lat) * margin
+    return (min_lon - d_lon, min_lat - d_lat, max_lon + d_lon, max_lat + d_lat)
+
+
+def intersect_bounds(a, b):
+    """兩個範圍的交集；沒有交集時回傳 None。"""
+    min_lon, min_lat = max(a[0], b[0]), max(a[1], b[1])
+    max_lon, max_lat = min(a[2], b[2]), min(a[3], b[3])
+    if min_lon >= max_lon or min_lat >= max_lat:
+        return None
+    return (min_lon, min_lat, max_lon, max_lat)
+
+
+def fit_zoom(bounds, width=VIEWPORT_WIDTH, height=VIEWPORT_HEIGHT, padding=0.1, max_zoom=MAX_ZOOM):
+    """讓 bounds 剛好放進 width x height 畫面 (四周各留 padding 比例) 的縮放等級。"""
+    min_lon, min_lat, max_lon, max_lat = bounds
+    (x0, x1), (y1, y0) = world_pixels([min_lon, max_lon], [min_lat, max_lat], 0)
+    span_x, span_y = max(x1 - x0, 1e-12), max(y1 - y0, 1e-12)
+    usable = 1 - 2 * padding
+    zoom = min(np.log2(width * usable / span_x), np.log2(height * usable / span_y))
+    return float(np.clip(zoom, 0, max_zoom))